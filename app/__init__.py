@@ -0,0 +1,4 @@
+import time
+
+# Marks when the app package started being imported, see `app.main`
+import_started_at = time.perf_counter()
@@ -0,0 +1,64 @@
+"""Management commands.
+
+Usage:
+    python -m app.commands sync-indexes
+    python -m app.commands archive-links [--inactive-days DAYS] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.core.archive import archive_inactive_short_urls
+from app.core.config import config
+from app.core.db import close_db, init_db
+from app.core.startup import ensure_superuser
+
+
+async def sync_indexes(_args: argparse.Namespace) -> None:
+    await init_db(sync_indexes=True)
+    await close_db()
+
+
+async def bootstrap_superuser(_args: argparse.Namespace) -> None:
+    await init_db(sync_indexes=False)
+    await ensure_superuser()
+    await close_db()
+
+
+async def archive_links(args: argparse.Namespace) -> None:
+    await init_db(sync_indexes=False)
+    try:
+        report = await archive_inactive_short_urls(
+            inactive_days=args.inactive_days,
+            batch_size=config.archive_batch_size,
+            pause=config.archive_batch_pause_seconds,
+            dry_run=args.dry_run,
+        )
+    finally:
+        await close_db()
+
+    if report.dry_run:
+        print(f"Would archive {report.matched} short URLs (dry run)")
+    else:
+        print(f"Archived {report.archived} of {report.matched} short URLs")
+
+
+commands = {
+    "sync-indexes": sync_indexes,
+    "bootstrap-superuser": bootstrap_superuser,
+    "archive-links": archive_links,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=commands)
+    parser.add_argument(
+        "--inactive-days", type=float, default=config.archive_inactive_days
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    asyncio.run(commands[args.command](args))
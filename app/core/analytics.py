@@ -0,0 +1,200 @@
+import asyncio
+import contextlib
+import logging
+import re
+from collections import Counter
+from datetime import UTC, datetime
+from urllib.parse import urlsplit
+
+from pymongo import UpdateOne
+
+from app.core.config import config
+from app.core.metrics import Counter as MetricCounter
+from app.core.metrics import Gauge, registry
+from app.models import Click, ClickRollup, RollupPeriod, UserAgentClass
+
+logger = logging.getLogger(__name__)
+
+type ClickEvent = tuple[str, datetime, str | None, str | None]
+
+BOT_USER_AGENT_PATTERN = re.compile(
+    r"bot|crawl|spider|slurp|curl|wget|python-requests|httpx|preview", re.IGNORECASE
+)
+MOBILE_USER_AGENT_PATTERN = re.compile(r"mobi|android|iphone|ipad", re.IGNORECASE)
+
+
+def classify_user_agent(user_agent: str | None) -> UserAgentClass:
+    if not user_agent:
+        return UserAgentClass.OTHER
+    if BOT_USER_AGENT_PATTERN.search(user_agent):
+        return UserAgentClass.BOT
+    if MOBILE_USER_AGENT_PATTERN.search(user_agent):
+        return UserAgentClass.MOBILE
+    if "mozilla" in user_agent.lower():
+        return UserAgentClass.DESKTOP
+
+    return UserAgentClass.OTHER
+
+
+def get_referrer_host(referrer: str | None) -> str | None:
+    if not referrer:
+        return None
+
+    return urlsplit(referrer).hostname
+
+
+def get_rollup_bucket(timestamp: datetime, period: RollupPeriod) -> datetime:
+    if period is RollupPeriod.DAY:
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+class ClickTracker:
+    """Bounded queue of click events that are written to the database in batches.
+
+    Tracking never blocks: when the queue is full the event is dropped and counted
+    in `dropped`. Each batch is inserted into the `clicks` time-series collection
+    and folded into the hourly/daily `click_rollups` counters.
+    """
+
+    def __init__(
+        self, *, max_size: int, batch_size: int, flush_interval: float
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: asyncio.Queue[ClickEvent] = asyncio.Queue(maxsize=max_size)
+        self._batch: list[ClickEvent] = []
+        self._writing: asyncio.Task | None = None
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return self._queue.qsize() + len(self._batch)
+
+    def track(
+        self, ident: str, *, referrer: str | None, user_agent: str | None
+    ) -> None:
+        try:
+            self._queue.put_nowait((ident, datetime.now(tz=UTC), referrer, user_agent))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _write(self, events: list[ClickEvent]) -> None:
+        clicks = []
+        rollups: Counter[tuple[str, RollupPeriod, datetime]] = Counter()
+        for ident, timestamp, referrer, user_agent in events:
+            clicks.append(
+                {
+                    "ident": ident,
+                    "timestamp": timestamp,
+                    "referrer_host": get_referrer_host(referrer),
+                    "user_agent_class": classify_user_agent(user_agent).value,
+                }
+            )
+            for period in RollupPeriod:
+                rollups[ident, period, get_rollup_bucket(timestamp, period)] += 1
+
+        try:
+            await Click.get_pymongo_collection().insert_many(clicks, ordered=False)
+        except Exception:
+            logger.exception("Failed to write %d click events", len(events))
+        # Applied even if the raw clicks failed, so the counters don't fall behind
+        try:
+            await ClickRollup.get_pymongo_collection().bulk_write(
+                [
+                    UpdateOne(
+                        {"ident": ident, "period": period.value, "bucket": bucket},
+                        {"$inc": {"clicks": count}},
+                        upsert=True,
+                    )
+                    for (ident, period, bucket), count in rollups.items()
+                ],
+                ordered=False,
+            )
+        except Exception:
+            logger.exception("Failed to roll up %d click events", len(events))
+
+    async def _write_batch(self) -> None:
+        if self._writing is not None:
+            await asyncio.shield(self._writing)
+
+        events, self._batch = self._batch, []
+        self._writing = asyncio.create_task(self._write(events))
+        self._writing.add_done_callback(self._clear_writing)
+        # Cancelling the writer loop (see `stop`) leaves the write running
+        await asyncio.shield(self._writing)
+
+    def _clear_writing(self, task: asyncio.Task) -> None:
+        if self._writing is task:
+            self._writing = None
+
+    def _drain(self, events: list[ClickEvent]) -> None:
+        while len(events) < self.batch_size:
+            try:
+                events.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+    async def _run(self) -> None:
+        # The batch being collected is kept on the tracker, so `stop` can write it
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                self._drain(self._batch)
+                timeout = deadline - loop.time()
+                if len(self._batch) >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    self._batch.append(
+                        await asyncio.wait_for(self._queue.get(), timeout)
+                    )
+                except TimeoutError:
+                    break
+
+            await self._write_batch()
+
+    async def flush(self) -> None:
+        """Writes the batch being collected and every queued event."""
+        while self._batch or not self._queue.empty():
+            self._drain(self._batch)
+            await self._write_batch()
+        if self._writing is not None:
+            await asyncio.shield(self._writing)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        await self.flush()
+
+
+click_tracker = ClickTracker(
+    max_size=config.click_queue_size,
+    batch_size=config.click_batch_size,
+    flush_interval=config.click_flush_interval_seconds,
+)
+
+registry.register(
+    Gauge(
+        "click_events_queued",
+        "Click events waiting to be written.",
+        callback=lambda: len(click_tracker),
+    )
+)
+registry.register(
+    MetricCounter(
+        "click_events_dropped_total",
+        "Click events dropped because the queue was full.",
+        callback=lambda: click_tracker.dropped,
+    )
+)
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+from app.core.snapshot import record_tombstones
+from app.models import ArchivedShortUrl, ShortUrl
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+@dataclass(slots=True)
+class ArchiveReport:
+    cutoff: datetime
+    matched: int
+    archived: int = 0
+    dry_run: bool = False
+
+
+def get_inactive_filter(cutoff: datetime) -> dict:
+    """Matches links not visited (or, if never visited, created) since `cutoff`.
+
+    Links with an expiration date are left to the TTL index.
+    """
+    return {
+        "expires_at": None,
+        "$or": [
+            {"last_visit_at": {"$lt": cutoff}},
+            {"last_visit_at": None, "created_at": {"$lt": cutoff}},
+        ],
+    }
+
+
+def to_archived(document: dict, archived_at: datetime) -> dict:
+    archived = {key: value for key, value in document.items() if key != "ident"}
+    archived["_id"] = document["ident"]
+    archived["url_id"] = document["_id"]
+    archived["archived_at"] = archived_at
+    return archived
+
+
+def from_archived(archived: dict) -> dict:
+    document = {
+        key: value
+        for key, value in archived.items()
+        if key not in ("url_id", "archived_at")
+    }
+    document["_id"] = archived["url_id"]
+    document["ident"] = archived["_id"]
+    return document
+
+
+async def archive_inactive_short_urls(
+    *, inactive_days: float, batch_size: int, pause: float, dry_run: bool = False
+) -> ArchiveReport:
+    """Moves inactive links to the archive, one batch at a time.
+
+    Each batch is copied first and only deleted from `urls` once the copy is
+    confirmed, so an interrupted run loses nothing and can simply be run again.
+    Links visited while their batch was being moved stay where they are.
+    """
+    urls = ShortUrl.get_pymongo_collection()
+    archive = ArchivedShortUrl.get_pymongo_collection()
+
+    cutoff = datetime.now(tz=UTC) - timedelta(days=inactive_days)
+    query = get_inactive_filter(cutoff)
+    report = ArchiveReport(
+        cutoff=cutoff, matched=await urls.count_documents(query), dry_run=dry_run
+    )
+    logger.info("Found %d short URLs inactive since %s", report.matched, cutoff)
+    if dry_run:
+        return report
+
+    while batch := await urls.find(query).limit(batch_size).to_list():
+        # Replaces copies left by an earlier, interrupted run, or stale ones left
+        # by concurrent restores, with the live documents
+        archived_at = datetime.now(tz=UTC)
+        await archive.bulk_write(
+            [
+                ReplaceOne(
+                    {"_id": document["ident"]},
+                    to_archived(document, archived_at),
+                    upsert=True,
+                )
+                for document in batch
+            ],
+            ordered=False,
+        )
+
+        idents = await archive.distinct(
+            "_id", {"_id": {"$in": [document["ident"] for document in batch]}}
+        )
+        if not idents:
+            logger.error("Failed to archive a batch of %d short URLs", len(batch))
+            break
+
+        result = await urls.delete_many({"ident": {"$in": idents}, **query})
+        if result.deleted_count < len(idents):
+            kept = await urls.distinct("ident", {"ident": {"$in": idents}})
+            await archive.delete_many({"_id": {"$in": kept}})
+            idents = list(set(idents) - set(kept))
+        await record_tombstones(idents)
+
+        report.archived += result.deleted_count
+        logger.info("Archived %d/%d short URLs", report.archived, report.matched)
+        await asyncio.sleep(pause)
+
+    return report
+
+
+async def restore_short_url(ident: str) -> dict | None:
+    """Moves an archived link back to `urls`, returns it or `None` if not archived.
+
+    Concurrent restores of the same link are harmless, a stale archived copy is
+    replaced the next time the link is archived.
+    """
+    archived = await ArchivedShortUrl.get_pymongo_collection().find_one({"_id": ident})
+    if archived is None:
+        return None
+
+    document = from_archived(archived)
+    try:
+        await ShortUrl.get_pymongo_collection().insert_one(document)
+    except DuplicateKeyError:
+        return document
+
+    await ArchivedShortUrl.get_pymongo_collection().delete_one({"_id": ident})
+    logger.info("Restored archived short URL %r", ident)
+    return document
@@ -0,0 +1,200 @@
+import asyncio
+import contextlib
+import logging
+import math
+from datetime import UTC, datetime, timedelta
+from hashlib import blake2b
+
+from beanie import Document
+
+from app.core.config import config
+from app.core.metrics import Gauge, registry
+from app.models import ArchivedShortUrl, ShortUrl
+
+logger = logging.getLogger(__name__)
+
+# How far back each sync re-reads created links
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """Bloom filter sized for `capacity` items at the given false-positive rate."""
+
+    def __init__(self, capacity: int, false_positive_rate: float) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(
+            8,
+            math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2),
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+    def _indexes(self, item: str) -> list[int]:
+        # Double hashing, two 64-bit halves of a single digest give every index
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        for index in self._indexes(item):
+            self._bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(item)
+        )
+
+
+class IdentFilter:
+    """Bloom filter of every existing short URL identifier.
+
+    Lets redirects for identifiers that definitely don't exist (e.g. scanners
+    guessing random idents) 404 without a database query. Built at startup from a
+    streamed projection, kept in sync with idents created by other workers every
+    `sync_interval` and rebuilt from scratch every `rebuild_interval`, since
+    deleted idents can't be removed from a Bloom filter.
+    """
+
+    def __init__(
+        self,
+        *,
+        false_positive_rate: float,
+        min_capacity: int,
+        sync_interval: float,
+        rebuild_interval: float,
+    ) -> None:
+        self.false_positive_rate = false_positive_rate
+        self.min_capacity = min_capacity
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._filter: BloomFilter | None = None
+        self._synced_at: datetime | None = None
+        self._added_while_building: list[str] | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._filter.memory_bytes if self._filter else 0
+
+    def add(self, ident: str) -> None:
+        if self._filter is not None:
+            self._filter.add(ident)
+        if self._added_while_building is not None:
+            self._added_while_building.append(ident)
+
+    def might_exist(self, ident: str) -> bool:
+        """Returns `False` only if the identifier definitely doesn't exist."""
+        return self._filter is None or ident in self._filter
+
+    async def _add_from(
+        self,
+        bloom_filter: BloomFilter,
+        query: dict,
+        *,
+        document_model: type[Document] = ShortUrl,
+        field: str = "ident",
+    ) -> None:
+        cursor = (
+            document_model.get_pymongo_collection()
+            .find(query, {field: True})
+            .batch_size(config.export_batch_size)
+        )
+        async for document in cursor:
+            bloom_filter.add(document[field])
+
+    async def rebuild(self) -> None:
+        started_at = datetime.now(tz=UTC)
+        self._added_while_building = []
+        try:
+            urls = ShortUrl.get_pymongo_collection()
+            archive = ArchivedShortUrl.get_pymongo_collection()
+            count = (
+                await urls.estimated_document_count()
+                + await archive.estimated_document_count()
+            )
+            # Leave room to grow until the next rebuild
+            bloom_filter = BloomFilter(
+                max(self.min_capacity, count * 2), self.false_positive_rate
+            )
+            await self._add_from(bloom_filter, {})
+            # Archived links are restored when visited, see `app.core.archive`
+            await self._add_from(
+                bloom_filter, {}, document_model=ArchivedShortUrl, field="_id"
+            )
+            for ident in self._added_while_building:
+                bloom_filter.add(ident)
+        finally:
+            self._added_while_building = None
+
+        self._filter = bloom_filter
+        self._synced_at = started_at
+        logger.info(
+            "Built ident filter with %d idents in %d KiB",
+            bloom_filter.count,
+            bloom_filter.memory_bytes // 1024,
+        )
+
+    async def sync(self) -> None:
+        if self._filter is None or self._synced_at is None:
+            return
+
+        started_at = datetime.now(tz=UTC)
+        # `created_at` is set before the insert commits, on the creating worker's
+        # clock, so links can show up late, re-adding recent ones is harmless
+        await self._add_from(
+            self._filter, {"created_at": {"$gte": self._synced_at - SYNC_OVERLAP}}
+        )
+        self._synced_at = started_at
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        rebuilt_at = -math.inf
+        while True:
+            try:
+                if loop.time() - rebuilt_at >= self.rebuild_interval:
+                    await self.rebuild()
+                    rebuilt_at = loop.time()
+                else:
+                    await self.sync()
+            except Exception:
+                logger.exception("Failed to update the ident filter")
+
+            await asyncio.sleep(self.sync_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+ident_filter = IdentFilter(
+    false_positive_rate=config.ident_filter_false_positive_rate,
+    min_capacity=config.ident_filter_min_capacity,
+    sync_interval=config.ident_filter_sync_seconds,
+    rebuild_interval=config.ident_filter_rebuild_seconds,
+)
+
+registry.register(
+    Gauge(
+        "ident_filter_memory_bytes",
+        "Memory used by the Bloom filter of existing idents.",
+        callback=lambda: ident_filter.memory_bytes,
+    )
+)
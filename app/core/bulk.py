@@ -0,0 +1,264 @@
+import asyncio
+import contextlib
+import logging
+import re
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+
+from beanie import PydanticObjectId
+from pymongo.asynchronous.collection import AsyncCollection
+
+from app.core.cache import principal_cache, redirect_cache, token_version_cache
+from app.core.config import config
+from app.core.snapshot import record_tombstones
+from app.models import (
+    ArchivedShortUrl,
+    BulkAction,
+    BulkJob,
+    Click,
+    ClickRollup,
+    JobStatus,
+    ShortUrl,
+    ShortUrlFilter,
+    User,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_short_url_query(short_url_filter: ShortUrlFilter) -> dict:
+    query: dict = {}
+    if short_url_filter.user_id:
+        query["user_id"] = short_url_filter.user_id
+    if short_url_filter.origin_domain:
+        domain = re.escape(short_url_filter.origin_domain.strip().lower())
+        # Scheme, optional userinfo and subdomains, then the domain itself
+        query["origin"] = {
+            "$regex": (rf"^[^:/]+://([^/?#@]*@)?([^/?#@]*\.)?{domain}(:\d+)?([/?#]|$)"),
+            "$options": "i",
+        }
+    if short_url_filter.created_after or short_url_filter.created_before:
+        query["created_at"] = {}
+        if short_url_filter.created_after:
+            query["created_at"]["$gte"] = short_url_filter.created_after
+        if short_url_filter.created_before:
+            query["created_at"]["$lt"] = short_url_filter.created_before
+    if short_url_filter.zero_views:
+        query["views"] = 0
+
+    return query
+
+
+# Applies a bulk action to a batch of `_id`s, returns the number of links changed
+type BatchProcessor = Callable[[AsyncCollection, list, list[str]], Awaitable[int]]
+
+
+async def delete_batch(
+    collection: AsyncCollection, ids: list, idents: list[str]
+) -> int:
+    result = await collection.delete_many({"_id": {"$in": ids}})
+    for model in (Click, ClickRollup):
+        await model.get_pymongo_collection().delete_many({"ident": {"$in": idents}})
+
+    return result.deleted_count
+
+
+async def deactivate_batch(
+    collection: AsyncCollection, ids: list, _idents: list[str]
+) -> int:
+    result = await collection.update_many(
+        {"_id": {"$in": ids}, "is_active": {"$ne": False}},
+        {"$set": {"is_active": False}},
+    )
+    return result.modified_count
+
+
+class BulkJobRunner:
+    """Runs bulk admin operations in the background.
+
+    Matching documents are read through a single cursor of `_id`s and deleted or
+    updated `batch_size` at a time with a pause in between, so a large cleanup
+    neither holds its result set in memory nor saturates the database. Progress is
+    saved on the job after every batch, so any worker can report it.
+    """
+
+    def __init__(self, *, batch_size: int, pause: float, stale_after: float) -> None:
+        self.batch_size = batch_size
+        self.pause = pause
+        self.stale_after = stale_after
+        self._tasks: set[asyncio.Task] = set()
+
+    async def _save(self, job: BulkJob) -> None:
+        # Doubles as a heartbeat, see `fail_stale_jobs`
+        job.updated_at = datetime.now(tz=UTC)
+        await job.save_changes()
+
+    async def fail_stale_jobs(self) -> int:
+        """Marks jobs left unfinished by a worker that died as failed.
+
+        Jobs are saved after every batch, so one that hasn't been updated for
+        `stale_after` seconds has no worker running it. Returns the number of jobs.
+        """
+        now = datetime.now(tz=UTC)
+        stale_before = now - timedelta(seconds=self.stale_after)
+        result = await BulkJob.get_pymongo_collection().update_many(
+            {
+                "status": {"$in": [JobStatus.PENDING.value, JobStatus.RUNNING.value]},
+                "$or": [
+                    {"updated_at": {"$lt": stale_before}},
+                    {"updated_at": None, "created_at": {"$lt": stale_before}},
+                ],
+            },
+            {
+                "$set": {
+                    "status": JobStatus.FAILED.value,
+                    "error": "Interrupted, the worker running it stopped",
+                    "finished_at": now,
+                }
+            },
+        )
+        if result.modified_count:
+            logger.warning("Marked %d stale bulk jobs as failed", result.modified_count)
+
+        return result.modified_count
+
+    async def _run(
+        self, job: BulkJob, run: Callable[[BulkJob], Awaitable[None]]
+    ) -> None:
+        job.status = JobStatus.RUNNING
+        await self._save(job)
+        try:
+            await run(job)
+            job.status = JobStatus.COMPLETED
+        except asyncio.CancelledError:
+            job.status = JobStatus.FAILED
+            job.error = "Interrupted by shutdown"
+            raise
+        except Exception as e:
+            logger.exception("Bulk job %s failed", job.id)
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now(tz=UTC)
+            await self._save(job)
+
+    async def submit(
+        self,
+        action: BulkAction,
+        criteria: dict,
+        run: Callable[[BulkJob], Awaitable[None]],
+    ) -> BulkJob:
+        job = BulkJob(action=action, criteria=criteria)
+        await job.insert()
+
+        task = asyncio.create_task(self._run(job, run))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return job
+
+    async def _process_short_urls(
+        self, job: BulkJob, query: dict, process: BatchProcessor
+    ) -> None:
+        """Runs `process` on the short URLs matching `query`, archived ones included.
+
+        Archived links are restored when visited, so they're processed too.
+        """
+        collections = [
+            (ShortUrl.get_pymongo_collection(), "ident"),
+            # Keyed by ident, see `ArchivedShortUrl`
+            (ArchivedShortUrl.get_pymongo_collection(), "_id"),
+        ]
+        job.matched = (job.matched or 0) + sum(
+            [await collection.count_documents(query) for collection, _ in collections]
+        )
+        await self._save(job)
+
+        for collection, ident_field in collections:
+            cursor = (
+                collection.find(query, {"_id": True, ident_field: True})
+                .sort("_id")
+                .batch_size(self.batch_size)
+            )
+            batch: list[dict] = []
+            async for document in cursor:
+                batch.append(document)
+                if len(batch) >= self.batch_size:
+                    await self._process_batch(
+                        job, collection, batch, ident_field, process
+                    )
+                    batch = []
+            if batch:
+                await self._process_batch(job, collection, batch, ident_field, process)
+
+    async def _process_batch(
+        self,
+        job: BulkJob,
+        collection: AsyncCollection,
+        batch: list[dict],
+        ident_field: str,
+        process: BatchProcessor,
+    ) -> None:
+        idents = [document[ident_field] for document in batch]
+        processed = await process(
+            collection, [document["_id"] for document in batch], idents
+        )
+        # Either way the links must stop being served from the snapshot and cache
+        await record_tombstones(idents)
+        for ident in idents:
+            redirect_cache.invalidate(ident)
+
+        job.processed += processed
+        await self._save(job)
+        logger.info("Bulk job %s: %d/%d", job.id, job.processed, job.matched)
+        await asyncio.sleep(self.pause)
+
+    async def delete_short_urls(self, job: BulkJob, query: dict) -> None:
+        """Deletes the short URLs matching `query` along with their clicks."""
+        await self._process_short_urls(job, query, delete_batch)
+
+    async def deactivate_short_urls(self, job: BulkJob, query: dict) -> None:
+        """Deactivates the short URLs matching `query`, see `ShortUrl.is_active`."""
+        await self._process_short_urls(job, query, deactivate_batch)
+
+    async def delete_user(self, job: BulkJob, user_id: PydanticObjectId) -> None:
+        """Deactivates the user, deletes their short URLs, then the user.
+
+        Deactivating first (and revoking their tokens) stops new links from being
+        created during the cascade. Once other workers' cached principals have
+        expired, a second sweep catches links created by requests in flight.
+        """
+        user = await User.get(user_id)
+        if user is None:
+            return
+
+        user.is_active = False
+        user.token_version += 1
+        await user.save_changes()
+        principal_cache.invalidate_where(
+            lambda key: key[0] in (str(user_id), user.username)
+        )
+        token_version_cache.invalidate(str(user_id))
+        deactivated_at = time.monotonic()
+
+        await self.delete_short_urls(job, {"user_id": user_id})
+        await asyncio.sleep(
+            config.principal_cache_ttl_seconds - (time.monotonic() - deactivated_at)
+        )
+        await self.delete_short_urls(job, {"user_id": user_id})
+
+        await user.delete()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+bulk_jobs = BulkJobRunner(
+    batch_size=config.bulk_batch_size,
+    pause=config.bulk_batch_pause_seconds,
+    stale_after=config.bulk_job_stale_seconds,
+)
@@ -0,0 +1,152 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Self
+
+from app.core.config import config
+from app.core.metrics import Counter, Gauge, registry
+from app.models import Principal
+
+# Fields of a short URL needed to serve its redirect
+CACHED_SHORT_URL_FIELDS = (
+    "origin",
+    "expires_at",
+    "redirect_status",
+    "cache_max_age",
+    "analytics",
+)
+
+
+@dataclass(slots=True, frozen=True)
+class CachedShortUrl:
+    origin: str
+    expires_at: datetime | None = None
+    status_code: int = 307
+    max_age: int | None = None
+    analytics: bool = True
+
+    @classmethod
+    def from_document(cls, document: dict) -> Self:
+        return cls(
+            origin=document["origin"],
+            expires_at=document.get("expires_at"),
+            status_code=document.get("redirect_status", 307),
+            max_age=document.get("cache_max_age"),
+            analytics=document.get("analytics", True),
+        )
+
+
+class TTLCache[K, V]:
+    """Bounded LRU cache whose entries expire after a fixed time.
+
+    A `None` value is a negative entry (e.g. an identifier that doesn't exist),
+    those are kept for `negative_ttl` so newly created keys show up quickly.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int,
+        ttl: float,
+        negative_ttl: float = 0.0,
+        track_stats: bool = False,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.track_stats = track_stats
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[K, tuple[float, V | None]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: K) -> tuple[bool, V | None]:
+        """Returns `(found, value)`, `value` is `None` for a negative entry."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            if self.track_stats:
+                self.misses += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        if self.track_stats:
+            self.hits += 1
+        return True, entry[1]
+
+    def set(self, key: K, value: V | None) -> None:
+        if self.max_size <= 0:
+            return
+
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[K], bool]) -> None:
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Redirect targets keyed by short URL identifier
+redirect_cache = TTLCache[str, CachedShortUrl](
+    max_size=config.redirect_cache_size,
+    ttl=config.redirect_cache_ttl_seconds,
+    negative_ttl=config.redirect_cache_negative_ttl_seconds,
+    track_stats=config.redirect_cache_stats,
+)
+
+# Authenticated principals keyed by token `(uid, exp)`, or `(sub, exp)` for tokens
+# issued without a `uid`
+principal_cache = TTLCache[tuple[str, int], Principal](
+    max_size=config.principal_cache_size,
+    ttl=config.principal_cache_ttl_seconds,
+)
+
+# Current `User.token_version` keyed by user ID, `None` for deleted users
+token_version_cache = TTLCache[str, int](
+    max_size=config.principal_cache_size,
+    ttl=config.principal_cache_ttl_seconds,
+    negative_ttl=config.principal_cache_ttl_seconds,
+)
+
+registry.register(
+    Gauge(
+        "redirect_cache_entries",
+        "Redirect targets held in the redirect cache.",
+        callback=lambda: len(redirect_cache),
+    )
+)
+if config.redirect_cache_stats:
+    registry.register(
+        Counter(
+            "redirect_cache_hits_total",
+            "Redirect cache lookups answered from the cache.",
+            callback=lambda: redirect_cache.hits,
+        )
+    )
+    registry.register(
+        Counter(
+            "redirect_cache_misses_total",
+            "Redirect cache lookups that missed or found an expired entry.",
+            callback=lambda: redirect_cache.misses,
+        )
+    )
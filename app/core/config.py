@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Literal
 
 from pydantic import (
     AnyUrl,
@@ -30,6 +30,17 @@ class Settings(BaseSettings):
         UrlConstraints(allowed_schemes=["mongodb", "mongodb+srv"]),
     ]
     mongo_db_name: str
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 2
+    mongo_max_idle_time_ms: int | None = None
+    mongo_connect_timeout_ms: int = 5_000
+    mongo_server_selection_timeout_ms: int = 5_000
+    mongo_socket_timeout_ms: int | None = None
+    # Comma separated list of wire compressors, e.g. "zstd,snappy,zlib"
+    mongo_compressors: str = ""
+    mongo_redirect_read_preference: Literal[
+        "primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"
+    ] = "primary"
 
     # CORS
     cors_origins: Annotated[list[AnyUrl] | str, BeforeValidator(parse_cors)] = []
@@ -43,6 +54,33 @@ class Settings(BaseSettings):
     secret_key: SecretStr
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    principal_cache_size: int = 10_000
+    principal_cache_ttl_seconds: float = 30.0
+    # Trust the claims embedded in access tokens instead of looking the user up,
+    # revoked tokens (see `User.token_version`) then stay valid until they expire
+    trust_token_claims: bool = False
+    # With trusted claims, still reject revoked tokens by checking their version
+    # against the user's, cached per user for `principal_cache_ttl_seconds`
+    trust_token_claims_check_version: bool = False
+
+    # Password hashing
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65_536
+    argon2_parallelism: int = 4
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+
+    # Startup, see `app.core.startup`. For scale-to-zero deployments skip index
+    # creation (run `python -m app.commands sync-indexes` on deploy instead),
+    # create the superuser in the background and load the API routers lazily
+    sync_indexes_on_startup: bool = True
+    defer_superuser_bootstrap: bool = False
+    lazy_routers: bool = False
+
+    # Metrics, `/metrics` is only served with a token, scrape it with
+    # `Authorization: Bearer <token>`
+    metrics_enabled: bool = True
+    metrics_token: SecretStr | None = None
 
     # Superuser
     first_superuser: str
@@ -51,6 +89,89 @@ class Settings(BaseSettings):
 
     # URLs
     url_ident_length: int = 7
+    url_ident_generator: Literal["random", "counter"] = "counter"
+    url_ident_block_size: int = 1_000
+    url_ident_scramble: bool = True
+    shorten_batch_max_size: int = 1_000
+    export_batch_size: int = 1_000
+
+    # Archival of links inactive for `archive_inactive_days`, see
+    # `python -m app.commands archive-links`
+    archive_inactive_days: float = 365.0
+    archive_batch_size: int = 1_000
+    archive_batch_pause_seconds: float = 0.1
+
+    # Bulk admin operations, see `app.core.bulk`
+    bulk_batch_size: int = 1_000
+    bulk_batch_pause_seconds: float = 0.05
+    # Unfinished jobs not updated for this long are marked as failed on startup,
+    # their worker having died. Must exceed `principal_cache_ttl_seconds`, which
+    # user deletion waits out between two updates
+    bulk_job_stale_seconds: float = 300.0
+
+    # Serve redirects from a pure ASGI middleware ahead of FastAPI's routing
+    fast_redirects: bool = True
+
+    # Redirect caching by browsers and CDNs, links set their own max-age up to
+    # the limit. Cached redirects aren't counted, so links with analytics are
+    # capped to a short max-age (0 disables caching them)
+    redirect_default_max_age_seconds: int = 0
+    redirect_analytics_max_age_seconds: int = 0
+    redirect_max_age_limit_seconds: int = 31_536_000
+
+    # Redirect cache, per worker. Edits and deletions only invalidate the worker
+    # handling them, other workers keep serving the old target for up to
+    # `redirect_cache_ttl_seconds`
+    redirect_cache_size: int = 10_000
+    redirect_cache_ttl_seconds: float = 60.0
+    redirect_cache_negative_ttl_seconds: float = 5.0
+    # Count hits and misses, exported as `redirect_cache_{hits,misses}_total`
+    redirect_cache_stats: bool = False
+
+    # Visit counting
+    visit_flush_interval_seconds: float = 5.0
+    visit_flush_max_pending: int = 1_000
+
+    # Trending links, ranked by visits that count half after every half-life
+    trending_half_life_hours: float = 24.0
+    trending_max_results: int = 100
+
+    # Hot link snapshot shared by all workers through a memory-mapped file,
+    # disabled unless a path is set
+    hot_link_snapshot_path: str | None = None
+    hot_link_snapshot_max_entries: int = 100_000
+    hot_link_snapshot_refresh_seconds: float = 30.0
+    hot_link_snapshot_full_rebuild_seconds: float = 600.0
+
+    # Rate limiting, token buckets per client IP (and per user where there is
+    # one): `burst` requests at once, refilled at `per_second`. The "mongo"
+    # backend shares buckets between workers at the cost of a query per check
+    rate_limit_enabled: bool = True
+    rate_limit_backend: Literal["memory", "mongo"] = "memory"
+    rate_limit_shards: int = 16
+    # Header holding the client IP set by a trusted proxy, e.g. "Fly-Client-IP"
+    rate_limit_client_ip_header: str | None = None
+    rate_limit_shorten_burst: int = 30
+    rate_limit_shorten_per_second: float = 0.5
+    rate_limit_token_burst: int = 10
+    rate_limit_token_per_second: float = 0.1
+    rate_limit_redirect_burst: int = 300
+    rate_limit_redirect_per_second: float = 50.0
+
+    # Bloom filter of existing idents, lets redirects for unknown idents 404
+    # without a database query. Idents created by other workers are picked up
+    # every sync interval, until then they can 404 on this worker
+    ident_filter_enabled: bool = False
+    ident_filter_false_positive_rate: float = 0.01
+    ident_filter_min_capacity: int = 100_000
+    ident_filter_sync_seconds: float = 2.0
+    ident_filter_rebuild_seconds: float = 3_600.0
+
+    # Click analytics
+    click_queue_size: int = 10_000
+    click_batch_size: int = 500
+    click_flush_interval_seconds: float = 2.0
+    click_retention_days: float = 90.0
 
 
 config = Settings.model_validate({})
@@ -1,12 +1,85 @@
+import asyncio
+
 from beanie import init_beanie
 from pymongo import AsyncMongoClient
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 
 from app.core.config import config
-from app.models import __beanie_models__
+from app.core.metrics import CommandMetricsListener
+from app.models import ShortUrl, __beanie_models__
+
+client: AsyncMongoClient | None = None
+redirect_collection: AsyncCollection | None = None
+
+
+def create_client() -> AsyncMongoClient:
+    return AsyncMongoClient(
+        str(config.mongo_uri),
+        tz_aware=True,
+        event_listeners=[CommandMetricsListener()] if config.metrics_enabled else [],
+        maxPoolSize=config.mongo_max_pool_size,
+        minPoolSize=config.mongo_min_pool_size,
+        maxIdleTimeMS=config.mongo_max_idle_time_ms,
+        connectTimeoutMS=config.mongo_connect_timeout_ms,
+        serverSelectionTimeoutMS=config.mongo_server_selection_timeout_ms,
+        socketTimeoutMS=config.mongo_socket_timeout_ms,
+        compressors=[
+            compressor.strip()
+            for compressor in config.mongo_compressors.split(",")
+            if compressor.strip()
+        ],
+    )
 
 
-async def init_db() -> None:
-    client = AsyncMongoClient(str(config.mongo_uri), tz_aware=True)
+async def warm_up_pool(mongo_client: AsyncMongoClient, connections: int) -> None:
+    """Opens up to `connections` pooled connections by pinging concurrently."""
+    await asyncio.gather(
+        *(mongo_client.admin.command("ping") for _ in range(max(connections, 1)))
+    )
+
+
+async def init_db(*, sync_indexes: bool = config.sync_indexes_on_startup) -> None:
+    global client, redirect_collection
+
+    client = create_client()
+    await warm_up_pool(client, config.mongo_min_pool_size)
     await init_beanie(
-        database=client[config.mongo_db_name], document_models=__beanie_models__
+        database=client[config.mongo_db_name],
+        document_models=__beanie_models__,
+        skip_indexes=not sync_indexes,
+    )
+    redirect_collection = create_redirect_collection()
+
+
+async def close_db() -> None:
+    global client, redirect_collection
+
+    redirect_collection = None
+    if client is not None:
+        await client.close()
+        client = None
+
+
+def create_redirect_collection() -> AsyncCollection:
+    """Returns the short URLs collection with the read preference for redirects.
+
+    Writes always go to the primary, redirects may tolerate slightly stale reads
+    from secondaries.
+    """
+    return ShortUrl.get_pymongo_collection().with_options(
+        read_preference=make_read_preference(
+            read_pref_mode_from_name(config.mongo_redirect_read_preference), None
+        )
     )
+
+
+def get_redirect_collection() -> AsyncCollection:
+    """Returns the redirect collection, built once by `init_db` and reused."""
+    global redirect_collection
+
+    # Scripts initializing Beanie themselves, e.g. the benchmarks
+    if redirect_collection is None:
+        redirect_collection = create_redirect_collection()
+
+    return redirect_collection
@@ -0,0 +1,102 @@
+import asyncio
+from typing import Protocol
+
+from pymongo import ReturnDocument
+
+from app.core.config import config
+from app.models import IdCounter
+from app.utils import encode_base62, generate_url_ident, scramble_id
+
+
+class IdentGenerator(Protocol):
+    async def next_ident(self) -> str: ...
+
+    async def next_idents(self, count: int) -> list[str]: ...
+
+
+class RandomIdentGenerator:
+    """Random base62 identifiers, collisions are possible but unlikely."""
+
+    def __init__(self, *, length: int) -> None:
+        self.length = length
+
+    async def next_ident(self) -> str:
+        return generate_url_ident(self.length)
+
+    async def next_idents(self, count: int) -> list[str]:
+        return [generate_url_ident(self.length) for _ in range(count)]
+
+
+class CounterIdentGenerator:
+    """Collision-free base62 identifiers allocated from leased counter blocks.
+
+    Each worker leases `block_size` ids at a time with a single atomic
+    `find_one_and_update` on the `counters` collection, so allocating an ident
+    needs no database round trip until the block runs out.
+    """
+
+    def __init__(
+        self, *, name: str, length: int, block_size: int, scramble: bool
+    ) -> None:
+        self.name = name
+        self.length = length
+        self.block_size = block_size
+        self.scramble = scramble
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def _lease_block(self, size: int) -> tuple[int, int]:
+        counter = await IdCounter.get_pymongo_collection().find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"value": size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        # Upserted, so there's always a document to return
+        assert counter is not None
+        return counter["value"] - size, counter["value"]
+
+    def _encode(self, number: int) -> str:
+        if self.scramble:
+            number = scramble_id(number, self.length)
+
+        return encode_base62(number, self.length)
+
+    async def next_ident(self) -> str:
+        async with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = await self._lease_block(self.block_size)
+
+            number = self._next
+            self._next += 1
+
+        return self._encode(number)
+
+    async def next_idents(self, count: int) -> list[str]:
+        async with self._lock:
+            numbers = list(range(self._next, min(self._next + count, self._end)))
+            self._next += len(numbers)
+            if len(numbers) < count:
+                # Lease the remainder in one go, topped up to a full block
+                missing = count - len(numbers)
+                start, self._end = await self._lease_block(missing + self.block_size)
+                numbers.extend(range(start, start + missing))
+                self._next = start + missing
+
+        return [self._encode(number) for number in numbers]
+
+
+def get_ident_generator() -> IdentGenerator:
+    if config.url_ident_generator == "counter":
+        return CounterIdentGenerator(
+            name="url_ident",
+            length=config.url_ident_length,
+            block_size=config.url_ident_block_size,
+            scramble=config.url_ident_scramble,
+        )
+
+    return RandomIdentGenerator(length=config.url_ident_length)
+
+
+ident_generator = get_ident_generator()
@@ -0,0 +1,294 @@
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+type LabelValues = tuple[str, ...]
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+# Redirects are expected to be served from memory in well under a millisecond
+REDIRECT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+)
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: tuple[str, ...], values: LabelValues, **extra: str) -> str:
+    pairs = [*zip(names, values, strict=True), *extra.items()]
+    if not pairs:
+        return ""
+
+    return (
+        "{"
+        + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in pairs)
+        + "}"
+    )
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric(ABC):
+    type = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]: ...
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A counter that's either incremented directly or read from `callback`."""
+
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        *,
+        callback: Callable[[], float] | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterator[str]:
+        if self.callback is not None:
+            yield f"{self.name} {format_value(self.callback())}"
+            return
+
+        for labels, value in self._values.items():
+            yield (
+                f"{self.name}{format_labels(self.labelnames, labels)} "
+                f"{format_value(value)}"
+            )
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    """Fixed-bucket histogram, observing a value is one bisect and two additions."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        *,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # Per label values: a count per bucket (the last one is +Inf) and the sum
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    @property
+    def count(self) -> int:
+        """Returns the number of observations across all label values."""
+        return sum(sum(counts) for counts, _ in self._values.values())
+
+    def samples(self) -> Iterator[str]:
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(
+                (*map(format_value, self.buckets), "+Inf"), counts, strict=True
+            ):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket"
+                    f"{format_labels(self.labelnames, labels, le=bound)} {cumulative}"
+                )
+            label_string = format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_string} {format_value(total[0])}"
+            yield f"{self.name}_count{label_string} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+
+    def register[M: Metric](self, metric: M) -> M:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
+
+http_requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+)
+http_request_duration_seconds = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route.",
+        ("method", "route", "status"),
+    )
+)
+redirect_request_duration_seconds = registry.register(
+    Histogram(
+        "redirect_request_duration_seconds",
+        "Latency of short URL redirects.",
+        ("status",),
+        buckets=REDIRECT_BUCKETS,
+    )
+)
+mongo_command_duration_seconds = registry.register(
+    Histogram(
+        "mongo_command_duration_seconds",
+        "MongoDB command latency by collection and command.",
+        ("collection", "command"),
+    )
+)
+mongo_command_errors_total = registry.register(
+    Counter(
+        "mongo_command_errors_total",
+        "Failed MongoDB commands by collection and command.",
+        ("collection", "command"),
+    )
+)
+password_hash_duration_seconds = registry.register(
+    Histogram(
+        "password_hash_duration_seconds",
+        "Time spent hashing or verifying passwords.",
+        ("operation",),
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    )
+)
+
+
+class MetricsMiddleware:
+    """Records per-route latency and in-flight requests.
+
+    A pure ASGI middleware, so the overhead per request is a couple of clock
+    reads and dictionary updates.
+    """
+
+    def __init__(self, app: ASGIApp, *, redirect_prefix: str = "/redirect") -> None:
+        self.app = app
+        self.redirect_prefix = redirect_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            http_requests_in_flight.dec()
+
+            if scope["path"].startswith(self.redirect_prefix):
+                redirect_request_duration_seconds.observe(elapsed, str(status_code))
+            else:
+                route = scope.get("route")
+                http_request_duration_seconds.observe(
+                    elapsed,
+                    scope["method"],
+                    getattr(route, "path", "unmatched"),
+                    str(status_code),
+                )
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Times every MongoDB command through pymongo's command monitoring."""
+
+    def __init__(self) -> None:
+        self._collections: dict[tuple[int, object], str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        self._collections[event.request_id, event.connection_id] = (
+            collection if isinstance(collection, str) else ""
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self._collections.pop((event.request_id, event.connection_id), "")
+        mongo_command_duration_seconds.observe(
+            event.duration_micros / 1e6, collection, event.command_name
+        )
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self._collections.pop((event.request_id, event.connection_id), "")
+        mongo_command_duration_seconds.observe(
+            event.duration_micros / 1e6, collection, event.command_name
+        )
+        mongo_command_errors_total.inc(collection, event.command_name)
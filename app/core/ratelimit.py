@@ -0,0 +1,227 @@
+import logging
+import math
+import time
+from typing import Protocol
+
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from starlette.requests import HTTPConnection
+
+from app.core.config import config
+from app.core.metrics import Counter, registry
+from app.models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+rate_limited_requests_total = registry.register(
+    Counter(
+        "rate_limited_requests_total",
+        "Requests rejected by the rate limiter by route.",
+        ("route",),
+    )
+)
+
+
+class RateLimitBackend(Protocol):
+    async def hit(self, key: str, *, burst: int, rate: float, cost: int = 1) -> float:
+        """Takes `cost` tokens from the bucket at `key`.
+
+        Returns `0` if the request is allowed, otherwise the number of seconds
+        until enough tokens are available. A cost above `burst` needs a full
+        bucket and leaves it in debt, so it's paid for by the following requests.
+        """
+        ...
+
+
+class MemoryRateLimitBackend:
+    """Token buckets held in memory, per worker.
+
+    Buckets are spread over `shards` dictionaries, and one shard at a time is
+    swept for buckets that have refilled (which behave exactly like missing
+    ones), so memory stays bounded by the recently active keys without ever
+    pausing to scan every bucket.
+    """
+
+    def __init__(self, *, shards: int = 16, sweep_interval: float = 60.0) -> None:
+        # Per key: tokens left, last update and the time the bucket is full again
+        self._shards: list[dict[str, tuple[float, float, float]]] = [
+            {} for _ in range(shards)
+        ]
+        self._sweep_every = sweep_interval / shards
+        self._next_sweep = 0.0
+        self._next_shard = 0
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def _sweep(self, now: float) -> None:
+        shard = self._shards[self._next_shard]
+        for key in [key for key, bucket in shard.items() if bucket[2] <= now]:
+            del shard[key]
+
+        self._next_shard = (self._next_shard + 1) % len(self._shards)
+        self._next_sweep = now + self._sweep_every
+
+    async def hit(self, key: str, *, burst: int, rate: float, cost: int = 1) -> float:
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        shard = self._shards[hash(key) % len(self._shards)]
+        bucket = shard.get(key)
+        tokens = (
+            float(burst)
+            if bucket is None
+            else min(burst, bucket[0] + (now - bucket[1]) * rate)
+        )
+        required = min(cost, burst)
+        if tokens < required:
+            shard[key] = (tokens, now, now + (burst - tokens) / rate)
+            return (required - tokens) / rate
+
+        tokens -= cost
+        shard[key] = (tokens, now, now + (burst - tokens) / rate)
+        return 0.0
+
+
+def token_bucket_pipeline(*, burst: int, rate: float, cost: int = 1) -> list[dict]:
+    """Update pipeline that refills the bucket and takes `cost` tokens if allowed.
+
+    See `RateLimitBackend.hit`.
+    """
+    elapsed_ms = {"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}
+    refilled = {
+        "$add": [
+            {"$ifNull": ["$tokens", burst]},
+            {"$multiply": [elapsed_ms, rate / 1000]},
+        ]
+    }
+    return [
+        {"$set": {"tokens": {"$min": [burst, refilled]}}},
+        {"$set": {"allowed": {"$gte": ["$tokens", min(cost, burst)]}}},
+        {
+            "$set": {
+                "tokens": {
+                    "$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]
+                },
+                "updated_at": "$$NOW",
+            }
+        },
+        {
+            "$set": {
+                # Once expired the bucket would have refilled anyway
+                "expires_at": {
+                    "$add": [
+                        "$$NOW",
+                        {
+                            "$ceil": {
+                                "$multiply": [
+                                    {"$subtract": [burst, "$tokens"]},
+                                    1000 / rate,
+                                ]
+                            }
+                        },
+                    ]
+                },
+            }
+        },
+    ]
+
+
+class MongoRateLimitBackend:
+    """Token buckets in the `rate_limits` collection, shared by all workers.
+
+    Every check is one atomic `find_one_and_update` with an update pipeline, so
+    it costs a database round trip. Buckets expire through a TTL index.
+    """
+
+    async def hit(self, key: str, *, burst: int, rate: float, cost: int = 1) -> float:
+        bucket = await RateLimitBucket.get_pymongo_collection().find_one_and_update(
+            {"_id": key},
+            token_bucket_pipeline(burst=burst, rate=rate, cost=cost),
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        # Upserted, so there's always a document to return
+        assert bucket is not None
+        if bucket["allowed"]:
+            return 0.0
+
+        return (min(cost, burst) - bucket["tokens"]) / rate
+
+
+class RateLimiter:
+    """Token bucket limit for a route, checked against one bucket per key.
+
+    Keys are typically the client IP and the authenticated user, a request is
+    rejected with `429 Too Many Requests` as soon as any of its buckets is empty.
+    Backend failures let requests through rather than taking the route down.
+    """
+
+    def __init__(
+        self, name: str, *, burst: int, rate: float, backend: RateLimitBackend
+    ) -> None:
+        self.name = name
+        self.burst = burst
+        self.rate = rate
+        self.backend = backend
+
+    async def check(self, *keys: str, cost: int = 1) -> None:
+        if not config.rate_limit_enabled:
+            return
+
+        for key in keys:
+            try:
+                retry_after = await self.backend.hit(
+                    f"{self.name}:{key}", burst=self.burst, rate=self.rate, cost=cost
+                )
+            except Exception:
+                logger.exception("Rate limit backend failed, allowing request")
+                return
+
+            if retry_after:
+                rate_limited_requests_total.inc(self.name)
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests, try again later",
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+
+
+def get_client_ip(connection: HTTPConnection) -> str:
+    """Returns the client IP, from `rate_limit_client_ip_header` when behind a proxy.
+
+    Only set the header for proxies that overwrite it, otherwise clients can
+    pick their own bucket.
+    """
+    if config.rate_limit_client_ip_header:
+        client_ip = connection.headers.get(config.rate_limit_client_ip_header)
+        if client_ip:
+            return client_ip.split(",", 1)[0].strip()
+
+    return connection.client.host if connection.client else "unknown"
+
+
+rate_limit_backend: RateLimitBackend = (
+    MongoRateLimitBackend()
+    if config.rate_limit_backend == "mongo"
+    else MemoryRateLimitBackend(shards=config.rate_limit_shards)
+)
+shorten_rate_limiter = RateLimiter(
+    "shorten",
+    burst=config.rate_limit_shorten_burst,
+    rate=config.rate_limit_shorten_per_second,
+    backend=rate_limit_backend,
+)
+token_rate_limiter = RateLimiter(
+    "token",
+    burst=config.rate_limit_token_burst,
+    rate=config.rate_limit_token_per_second,
+    backend=rate_limit_backend,
+)
+redirect_rate_limiter = RateLimiter(
+    "redirect",
+    burst=config.rate_limit_redirect_burst,
+    rate=config.rate_limit_redirect_per_second,
+    backend=rate_limit_backend,
+)
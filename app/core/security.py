@@ -1,23 +1,106 @@
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
 
 import jwt
+from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
 
 from app.core.config import config
+from app.core.metrics import Gauge, password_hash_duration_seconds, registry
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
 
-password_hash = PasswordHash.recommended()
+password_hash = PasswordHash(
+    (
+        Argon2Hasher(
+            time_cost=config.argon2_time_cost,
+            memory_cost=config.argon2_memory_cost,
+            parallelism=config.argon2_parallelism,
+        ),
+    )
+)
+
+
+class PasswordHashPool:
+    """Runs password hashing off the event loop on a bounded thread pool.
+
+    Argon2 releases the GIL, so a few threads keep the loop responsive. Once
+    `max_pending` calls are running or queued, new ones fail fast with a 503
+    instead of piling up.
+    """
+
+    def __init__(self, *, max_workers: int, max_pending: int) -> None:
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hash"
+        )
+
+    async def run[T](self, func: Callable[..., T], *args: str) -> T:
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent authentication requests",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, func, *args
+            )
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hash_pool = PasswordHashPool(
+    max_workers=config.password_hash_workers,
+    max_pending=config.password_hash_max_pending,
+)
+
+
+registry.register(
+    Gauge(
+        "password_hash_pending",
+        "Password hashing calls running or queued.",
+        callback=lambda: password_hash_pool.pending,
+    )
+)
 
 
-def hash_password(password: str) -> str:
-    return password_hash.hash(password)
+def timed_hash(password: str) -> str:
+    started_at = time.perf_counter()
+    try:
+        return password_hash.hash(password)
+    finally:
+        password_hash_duration_seconds.observe(time.perf_counter() - started_at, "hash")
+
+
+def timed_verify(plain_password: str, hashed_password: str) -> bool:
+    started_at = time.perf_counter()
+    try:
+        return password_hash.verify(plain_password, hashed_password)
+    finally:
+        password_hash_duration_seconds.observe(
+            time.perf_counter() - started_at, "verify"
+        )
+
+
+async def hash_password(password: str) -> str:
+    return await password_hash_pool.run(timed_hash, password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return password_hash.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hash_pool.run(timed_verify, plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
@@ -40,10 +123,10 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return encoded_jwt
 
 
-def verify_access_token(token: str) -> str | None:
-    """Verify a JWT access token and return the subject (user id) if valid."""
+def decode_access_token(token: str) -> dict | None:
+    """Verify a JWT access token and return its claims if valid."""
     try:
-        payload = jwt.decode(
+        return jwt.decode(
             token,
             config.secret_key.get_secret_value(),
             algorithms=[config.algorithm],
@@ -51,5 +134,12 @@ def verify_access_token(token: str) -> str | None:
         )
     except jwt.InvalidTokenError:
         return None
-    else:
-        return payload.get("sub")
+
+
+def verify_access_token(token: str) -> str | None:
+    """Verify a JWT access token and return the subject (username) if valid."""
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+
+    return payload.get("sub")
@@ -0,0 +1,331 @@
+import asyncio
+import contextlib
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import IO
+
+from pymongo import UpdateOne
+
+from app.core.cache import CACHED_SHORT_URL_FIELDS, CachedShortUrl
+from app.core.config import config
+from app.models import ShortUrl, ShortUrlTombstone
+
+logger = logging.getLogger(__name__)
+
+# File layout (little-endian):
+#   header   magic, version, slot count (a power of two), entry count
+#   slots    slot count * (crc32 of ident, record offset), offset 0 is empty
+#   records  ident length, origin length, expires_at in ms (-1 if none),
+#            redirect status, cache max-age (-1 if none), analytics flag,
+#            ident bytes, origin bytes
+MAGIC = b"USHL"
+VERSION = 2
+HEADER = struct.Struct("<4sIII")
+SLOT = struct.Struct("<II")
+RECORD = struct.Struct("<BIqHi?")
+# Incremental refreshes re-read changes this far back, covering writes that
+# committed late and clock skew between workers
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+def hash_ident(ident: bytes) -> int:
+    return zlib.crc32(ident)
+
+
+def encode_snapshot(entries: dict[str, CachedShortUrl]) -> bytes:
+    """Encodes entries into an open-addressed hash table kept at most half full."""
+    slot_count = 1
+    while slot_count < len(entries) * 2:
+        slot_count *= 2
+    mask = slot_count - 1
+
+    slots = bytearray(slot_count * SLOT.size)
+    records = bytearray()
+    records_offset = HEADER.size + len(slots)
+    for ident, entry in entries.items():
+        ident_bytes = ident.encode()
+        origin_bytes = entry.origin.encode()
+        expires_ms = (
+            int(entry.expires_at.timestamp() * 1000) if entry.expires_at else -1
+        )
+
+        ident_hash = hash_ident(ident_bytes)
+        index = ident_hash & mask
+        while SLOT.unpack_from(slots, index * SLOT.size)[1]:
+            index = (index + 1) & mask
+        SLOT.pack_into(
+            slots, index * SLOT.size, ident_hash, records_offset + len(records)
+        )
+
+        records += RECORD.pack(
+            len(ident_bytes),
+            len(origin_bytes),
+            expires_ms,
+            entry.status_code,
+            -1 if entry.max_age is None else entry.max_age,
+            entry.analytics,
+        )
+        records += ident_bytes
+        records += origin_bytes
+
+    header = HEADER.pack(MAGIC, VERSION, slot_count, len(entries))
+    return header + slots + records
+
+
+def write_snapshot(path: Path, entries: dict[str, CachedShortUrl]) -> None:
+    """Writes the snapshot next to `path` and atomically swaps it in."""
+    temporary_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    temporary_path.write_bytes(encode_snapshot(entries))
+    temporary_path.replace(path)
+
+
+class HotLinkSnapshot:
+    """Read-only, memory-mapped view of a snapshot file.
+
+    Every worker maps the same file, so the page cache holds a single copy no
+    matter how many workers there are. Lookups decode only the matching record.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._mmap: mmap.mmap | None = None
+        self._mask = 0
+        self._inode: tuple[int, int] | None = None
+
+    def __len__(self) -> int:
+        if self._mmap is None:
+            return 0
+
+        return HEADER.unpack_from(self._mmap)[3]
+
+    def reload(self) -> bool:
+        """Maps the current snapshot file if it has been replaced since."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return False
+        if (stat.st_ino, stat.st_mtime_ns) == self._inode or not stat.st_size:
+            return False
+
+        with self.path.open("rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, slot_count, _ = HEADER.unpack_from(mapped)
+        if magic != MAGIC or version != VERSION:
+            mapped.close()
+            logger.warning("Ignoring invalid hot link snapshot %s", self.path)
+            return False
+
+        # The previous map stays valid for lookups in flight, it's closed when
+        # garbage collected
+        self._mmap, self._mask = mapped, slot_count - 1
+        self._inode = (stat.st_ino, stat.st_mtime_ns)
+        return True
+
+    def lookup(self, ident: str) -> CachedShortUrl | None:
+        mapped = self._mmap
+        if mapped is None:
+            return None
+
+        ident_bytes = ident.encode()
+        ident_hash = hash_ident(ident_bytes)
+        index = ident_hash & self._mask
+        while True:
+            slot_hash, offset = SLOT.unpack_from(
+                mapped, HEADER.size + index * SLOT.size
+            )
+            if not offset:
+                return None
+            if slot_hash == ident_hash:
+                (
+                    ident_length,
+                    origin_length,
+                    expires_ms,
+                    status_code,
+                    max_age,
+                    analytics,
+                ) = RECORD.unpack_from(mapped, offset)
+                start = offset + RECORD.size
+                if mapped[start : start + ident_length] == ident_bytes:
+                    start += ident_length
+                    return CachedShortUrl(
+                        origin=mapped[start : start + origin_length].decode(),
+                        expires_at=(
+                            datetime.fromtimestamp(expires_ms / 1000, tz=UTC)
+                            if expires_ms >= 0
+                            else None
+                        ),
+                        status_code=status_code,
+                        max_age=max_age if max_age >= 0 else None,
+                        analytics=analytics,
+                    )
+
+            index = (index + 1) & self._mask
+
+
+async def record_tombstones(idents: list[str]) -> None:
+    """Records deleted or archived links for the next snapshot refresh.
+
+    Called after the links have been removed from `urls`, so a refresh can't
+    read them back in after dropping them.
+    """
+    if not config.hot_link_snapshot_path or not idents:
+        return
+
+    deleted_at = datetime.now(tz=UTC)
+    await ShortUrlTombstone.get_pymongo_collection().bulk_write(
+        [
+            UpdateOne({"_id": ident}, {"$set": {"deleted_at": deleted_at}}, upsert=True)
+            for ident in idents
+        ],
+        ordered=False,
+    )
+
+
+class HotLinkSnapshotBuilder:
+    """Keeps the snapshot file up to date from a single worker.
+
+    Workers race for an exclusive lock file, the winner rebuilds the snapshot:
+    incrementally from links visited or created since the last refresh, and from
+    scratch every `full_rebuild_interval`. Links deleted or archived since the
+    last refresh are dropped using their tombstones (see `record_tombstones`), so
+    a removed link is served for at most one refresh interval. Every worker
+    remaps the file once it has been replaced.
+    """
+
+    def __init__(
+        self,
+        snapshot: HotLinkSnapshot,
+        *,
+        max_entries: int,
+        refresh_interval: float,
+        full_rebuild_interval: float,
+    ) -> None:
+        self.snapshot = snapshot
+        self.max_entries = max_entries
+        self.refresh_interval = refresh_interval
+        self.full_rebuild_interval = full_rebuild_interval
+        self._entries: dict[str, tuple[int, CachedShortUrl]] = {}
+        self._refreshed_at: datetime | None = None
+        self._rebuilt_at = 0.0
+        self._lock_file: IO[bytes] | None = None
+        self._task: asyncio.Task | None = None
+
+    def _acquire_lock(self) -> bool:
+        if self._lock_file is not None:
+            return True
+
+        lock_file = self.snapshot.path.with_name(f"{self.snapshot.path.name}.lock")
+        file = lock_file.open("wb")
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            file.close()
+            return False
+
+        self._lock_file = file
+        return True
+
+    async def refresh(self) -> None:
+        started_at = datetime.now(tz=UTC)
+        since = (
+            self._refreshed_at - REFRESH_OVERLAP
+            if self._refreshed_at is not None
+            else None
+        )
+        full_rebuild = (
+            since is None
+            or time.monotonic() - self._rebuilt_at >= self.full_rebuild_interval
+        )
+        if since is None or full_rebuild:
+            query: dict = {"is_active": {"$ne": False}}
+            self._entries = {}
+        else:
+            async for tombstone in ShortUrlTombstone.get_pymongo_collection().find(
+                {"deleted_at": {"$gte": since}}, {"_id": True}
+            ):
+                self._entries.pop(tombstone["_id"], None)
+
+            query = {
+                "is_active": {"$ne": False},
+                "$or": [
+                    {"last_visit_at": {"$gte": since}},
+                    {"created_at": {"$gte": since}},
+                ],
+            }
+
+        cursor = (
+            ShortUrl.get_pymongo_collection()
+            .find(
+                query,
+                {
+                    "_id": False,
+                    "ident": True,
+                    "views": True,
+                    **dict.fromkeys(CACHED_SHORT_URL_FIELDS, True),
+                },
+            )
+            .sort("views", -1)
+            .limit(self.max_entries)
+        )
+        async for document in cursor:
+            self._entries[document["ident"]] = (
+                document.get("views", 0),
+                CachedShortUrl.from_document(document),
+            )
+
+        if len(self._entries) > self.max_entries:
+            hottest = sorted(
+                self._entries.items(), key=lambda item: item[1][0], reverse=True
+            )
+            self._entries = dict(hottest[: self.max_entries])
+
+        await asyncio.to_thread(
+            write_snapshot,
+            self.snapshot.path,
+            {ident: entry for ident, (_, entry) in self._entries.items()},
+        )
+        self._refreshed_at = started_at
+        if full_rebuild:
+            self._rebuilt_at = time.monotonic()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if self._acquire_lock():
+                    await self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh the hot link snapshot")
+            self.snapshot.reload()
+
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+hot_links = HotLinkSnapshot(Path(config.hot_link_snapshot_path or "hot-links.bin"))
+hot_links_builder = HotLinkSnapshotBuilder(
+    hot_links,
+    max_entries=config.hot_link_snapshot_max_entries,
+    refresh_interval=config.hot_link_snapshot_refresh_seconds,
+    full_rebuild_interval=config.hot_link_snapshot_full_rebuild_seconds,
+)
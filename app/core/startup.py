@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import config
+from app.models import User
+from app.utils import normalize_email, normalize_username
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Collects how long each startup phase took, for cold start tuning."""
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started_at)
+
+    def report(self) -> str:
+        total = sum(self.phases.values())
+        phases = ", ".join(
+            f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases.items()
+        )
+        return f"Startup took {total * 1000:.1f}ms ({phases})"
+
+
+async def ensure_superuser() -> None:
+    # Imported here so redirect-only cold starts don't pay for loading Argon2
+    from app.core.security import hash_password
+
+    superuser = await User.find(
+        User.username == normalize_username(config.first_superuser),
+        User.email == normalize_email(config.first_superuser_email),
+    ).first_or_none()
+    if not superuser:
+        await User(
+            username=config.first_superuser,
+            email=normalize_email(config.first_superuser_email),
+            password_hash=await hash_password(
+                config.first_superuser_password.get_secret_value()
+            ),
+            is_superuser=True,
+        ).insert()
+
+
+def import_api_routers() -> None:
+    """Imports the API routers, meant to run in a thread.
+
+    The import holds the GIL, but the interpreter still switches back to the
+    event loop every few milliseconds so redirects keep being served.
+    """
+    from app.routers import auth, jobs, urls, users  # noqa: F401
+
+
+def include_api_routers(app: FastAPI) -> None:
+    from app.routers import auth, jobs, urls, users
+
+    app.include_router(auth.router)
+    app.include_router(users.router)
+    app.include_router(urls.router)
+    app.include_router(jobs.router)
+    # Routes changed after the schema may have been generated
+    app.openapi_schema = None
+
+
+class LazyRoutersMiddleware:
+    """Holds non-redirect requests until the API routers have been loaded.
+
+    Lets the app start serving redirects before the rest of the API is imported.
+    """
+
+    def __init__(
+        self, app: ASGIApp, *, loaded: asyncio.Event, redirect_prefix: str = "/redirect"
+    ) -> None:
+        self.app = app
+        self.loaded = loaded
+        self.redirect_prefix = redirect_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] == "http"
+            and not self.loaded.is_set()
+            and not scope["path"].startswith(self.redirect_prefix)
+        ):
+            await self.loaded.wait()
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,71 @@
+"""Trending short URLs ranked by exponentially decayed visit counts.
+
+Uses forward decay: a visit at time `t` weighs `2 ** (t / half_life)` relative
+to a fixed epoch, so a link's decayed count is the sum of its visit weights
+divided by the weight of "now". Dividing by the same weight doesn't change the
+order of links, so the sum can be incremented in place and ranked by an index,
+without ever rewriting older scores. To keep it from overflowing, the sum is
+stored as its base 2 logarithm (`ShortUrl.trend_score`).
+"""
+
+from datetime import UTC, datetime
+
+from pydantic import BaseModel
+
+from app.core.config import config
+from app.models import ShortUrl
+from app.pagination import get_output_fields
+
+TRENDING_EPOCH = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def get_trend_level(at: datetime) -> float:
+    """Returns the base 2 logarithm of the weight of a visit at `at`."""
+    return (at - TRENDING_EPOCH).total_seconds() / (
+        config.trending_half_life_hours * 3_600
+    )
+
+
+def add_visits_expression(visits: int, visited_at: datetime) -> dict:
+    """Aggregation expression adding `visits` to the stored `trend_score`.
+
+    `log2(2**score + visits * 2**level)` is computed as
+    `level + log2(2**(score - level) + visits)`, where `2**(score - level)` is
+    the decayed count so far (0 when the link has never been visited).
+    """
+    level = get_trend_level(visited_at)
+    decayed_count = {
+        "$ifNull": [{"$pow": [2, {"$subtract": ["$trend_score", level]}]}, 0]
+    }
+
+    return {"$add": [level, {"$log": [{"$add": [decayed_count, visits]}, 2]}]}
+
+
+def get_decayed_count(trend_score: float, now: datetime) -> float:
+    return 2 ** (trend_score - get_trend_level(now))
+
+
+async def find_trending_short_urls(
+    query: dict, *, limit: int, model: type[BaseModel]
+) -> list[dict]:
+    """Returns the top `limit` links matching `query` in the shape of `model`.
+
+    Reads `limit` entries of a `trend_score` index, links that were never
+    visited are left out.
+    """
+    projection = {key: True for key, _ in get_output_fields(model).values()}
+    cursor = (
+        ShortUrl.get_pymongo_collection()
+        .find(
+            {**query, "trend_score": {"$ne": None}},
+            {**projection, "trend_score": True},
+        )
+        .sort("trend_score", -1)
+        .limit(limit)
+    )
+
+    now = datetime.now(tz=UTC)
+    return [
+        {**document, "score": get_decayed_count(document["trend_score"], now)}
+        async for document in cursor
+    ]
@@ -0,0 +1,140 @@
+import asyncio
+import contextlib
+import logging
+from datetime import UTC, datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.core.config import config
+from app.core.metrics import Gauge, registry
+from app.core.trending import add_visits_expression
+from app.models import ShortUrl
+
+logger = logging.getLogger(__name__)
+
+
+class VisitCounter:
+    """Write-behind accumulator for short URL visits.
+
+    Visits are merged per identifier in memory and flushed periodically (or once
+    `max_pending` identifiers are pending) as a single unordered `bulk_write` of
+    updates, so a hot link costs one write per flush window. Each update also
+    adds the visits to the link's decayed trending score.
+    """
+
+    def __init__(self, *, flush_interval: float, max_pending: int) -> None:
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: dict[str, tuple[int, datetime]] = {}
+        self._flush_requested = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._flushing: asyncio.Task[int] | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def record(self, ident: str, visited_at: datetime | None = None) -> None:
+        visited_at = visited_at or datetime.now(tz=UTC)
+        views, last_visit_at = self._pending.get(ident, (0, visited_at))
+        self._pending[ident] = (views + 1, max(last_visit_at, visited_at))
+
+        if len(self._pending) >= self.max_pending:
+            self._flush_requested.set()
+
+    def _merge(self, pending: dict[str, tuple[int, datetime]]) -> None:
+        for ident, (views, last_visit_at) in pending.items():
+            pending_views, pending_last_visit_at = self._pending.get(
+                ident, (0, last_visit_at)
+            )
+            self._pending[ident] = (
+                pending_views + views,
+                max(pending_last_visit_at, last_visit_at),
+            )
+
+    async def _write(self, pending: dict[str, tuple[int, datetime]]) -> int:
+        operations = [
+            UpdateOne(
+                {"ident": ident},
+                [
+                    {
+                        "$set": {
+                            "views": {"$add": [{"$ifNull": ["$views", 0]}, views]},
+                            "last_visit_at": {
+                                "$max": ["$last_visit_at", last_visit_at]
+                            },
+                            "trend_score": add_visits_expression(views, last_visit_at),
+                        }
+                    }
+                ],
+            )
+            for ident, (views, last_visit_at) in pending.items()
+        ]
+        try:
+            await ShortUrl.get_pymongo_collection().bulk_write(
+                operations, ordered=False
+            )
+        except BulkWriteError:
+            # Rejected updates would be rejected again, the rest were applied
+            logger.exception("Failed to flush some of %d visit counts", len(operations))
+        except Exception:
+            logger.exception("Failed to flush %d visit counts", len(operations))
+            # Retried with the next flush
+            self._merge(pending)
+
+        return len(operations)
+
+    async def flush(self) -> int:
+        """Writes all pending visits to the database, returns the number of links."""
+        if self._flushing is not None:
+            # A single write at a time, so a retried batch isn't written twice
+            await asyncio.shield(self._flushing)
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        self._flushing = asyncio.create_task(self._write(pending))
+        self._flushing.add_done_callback(self._clear_flushing)
+        # Cancelling the flush loop (see `stop`) leaves the write running
+        return await asyncio.shield(self._flushing)
+
+    def _clear_flushing(self, task: asyncio.Task) -> None:
+        if self._flushing is task:
+            self._flushing = None
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(
+                    self._flush_requested.wait(), timeout=self.flush_interval
+                )
+            self._flush_requested.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        # Waits for a write interrupted by the cancellation, then writes the rest
+        await self.flush()
+
+
+visit_counter = VisitCounter(
+    flush_interval=config.visit_flush_interval_seconds,
+    max_pending=config.visit_flush_max_pending,
+)
+
+registry.register(
+    Gauge(
+        "visit_counter_pending",
+        "Short URLs with visits waiting to be flushed.",
+        callback=lambda: len(visit_counter),
+    )
+)
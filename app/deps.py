@@ -1,12 +1,24 @@
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
-
-from app.core.security import oauth2_scheme, verify_access_token
-from app.models import PaginationParams, SortingParams, User
+from beanie import PydanticObjectId
+from fastapi import Depends, HTTPException, Query, Request, status
+
+from app.core.cache import principal_cache, token_version_cache
+from app.core.config import config
+from app.core.ratelimit import get_client_ip, shorten_rate_limiter
+from app.core.security import decode_access_token, oauth2_scheme
+from app.models import (
+    ExportFormat,
+    PaginationParams,
+    Principal,
+    SortingParams,
+    User,
+)
 
 PaginationParamsDep = Annotated[PaginationParams, Depends()]
 SortParamsDep = Annotated[SortingParams, Depends()]
+ExportFormatDep = Annotated[ExportFormat, Query(alias="format")]
+TrendingLimitDep = Annotated[int, Query(ge=1, le=config.trending_max_results)]
 
 
 TokenDep = Annotated[str, Depends(oauth2_scheme)]
@@ -19,15 +31,22 @@ credentials_exception = HTTPException(
 )
 
 
+async def get_token_user(claims: dict) -> User | None:
+    """Looks up the token's user by ID, so renaming the user doesn't matter."""
+    # Tokens issued before `uid` was added only carry the username
+    if "uid" not in claims:
+        return await User.find(User.username == claims["sub"]).first_or_none()
+
+    return await User.get(PydanticObjectId(claims["uid"]))
+
+
 async def get_current_user(token: TokenDep) -> User:
-    username = verify_access_token(token)
-    if username is None:
+    claims = decode_access_token(token)
+    if claims is None:
         raise credentials_exception
 
-    # results = await session.execute(select(User).where(User.id == user_id))
-    # user = results.scalars().first()
-    user = await User.find(User.username == username).first_or_none()
-    if not user:
+    user = await get_token_user(claims)
+    if not user or claims.get("ver", 0) != user.token_version:
         raise credentials_exception
 
     return user
@@ -36,6 +55,70 @@ async def get_current_user(token: TokenDep) -> User:
 CurrentUserDep = Annotated[User, Depends(get_current_user)]
 
 
+async def get_token_version(user_id: PydanticObjectId) -> int | None:
+    """Returns the user's current token version, `None` if the user is gone."""
+    found, token_version = token_version_cache.get(str(user_id))
+    if not found:
+        user = await User.get_pymongo_collection().find_one(
+            {"_id": user_id}, {"token_version": True}
+        )
+        token_version = user.get("token_version", 0) if user else None
+        token_version_cache.set(str(user_id), token_version)
+
+    return token_version
+
+
+async def get_current_principal(token: TokenDep) -> Principal:
+    """Like `get_current_user`, but avoids a database read on every request.
+
+    Principals are cached by the token's `(uid, exp)`, or taken straight from the
+    token claims when `trust_token_claims` is set (checking only the token
+    version, cached per user, with `trust_token_claims_check_version`).
+    """
+    claims = decode_access_token(token)
+    if claims is None:
+        raise credentials_exception
+
+    if config.trust_token_claims and "uid" in claims:
+        principal = Principal(
+            id=PydanticObjectId(claims["uid"]),
+            username=claims["sub"],
+            is_active=claims.get("act", True),
+            is_superuser=claims.get("su", False),
+            token_version=claims.get("ver", 0),
+        )
+        if (
+            config.trust_token_claims_check_version
+            and await get_token_version(principal.id) != principal.token_version
+        ):
+            raise credentials_exception
+
+        return principal
+
+    key = (claims.get("uid", claims["sub"]), claims["exp"])
+    found, principal = principal_cache.get(key)
+    if not found:
+        user = await get_token_user(claims)
+        # `id` is only unset on documents that were never inserted
+        if user and user.id:
+            principal = Principal(
+                id=user.id,
+                username=user.username,
+                is_active=user.is_active,
+                is_superuser=user.is_superuser,
+                token_version=user.token_version,
+            )
+            principal_cache.set(key, principal)
+
+    if not principal or claims.get("ver", 0) != principal.token_version:
+        raise credentials_exception
+
+    return principal
+
+
+CurrentPrincipalDep = Annotated[Principal, Depends(get_current_principal)]
+
+
 async def get_current_active_user(current_user: CurrentUserDep) -> User:
     if not current_user.is_active:
         raise HTTPException(
@@ -49,6 +132,38 @@ async def get_current_active_user(current_user: CurrentUserDep) -> User:
 CurrentActiveUserDep = Annotated[User, Depends(get_current_active_user)]
 
 
+async def get_current_active_principal(
+    current_principal: CurrentPrincipalDep,
+) -> Principal:
+    if not current_principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Inactive user",
+        )
+
+    return current_principal
+
+
+CurrentActivePrincipalDep = Annotated[Principal, Depends(get_current_active_principal)]
+
+
+async def charge_shorten_rate_limit(
+    request: Request, current_principal: Principal, *, cost: int = 1
+) -> None:
+    """Takes `cost` tokens, one per link, from the caller's shorten buckets."""
+    await shorten_rate_limiter.check(
+        f"ip:{get_client_ip(request)}",
+        f"user:{current_principal.username}",
+        cost=cost,
+    )
+
+
+async def check_shorten_rate_limit(
+    request: Request, current_principal: CurrentActivePrincipalDep
+) -> None:
+    await charge_shorten_rate_limit(request, current_principal)
+
+
 async def get_current_active_superuser(current_user: CurrentUserDep) -> User:
     if not current_user.is_superuser:
         raise HTTPException(
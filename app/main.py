@@ -1,44 +1,102 @@
-import re
+import asyncio
+import logging
+import time
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
+from app import import_started_at
+from app.core.analytics import click_tracker
+from app.core.bloom import ident_filter
+from app.core.bulk import bulk_jobs
 from app.core.config import config
-from app.core.db import init_db
-from app.core.security import hash_password
-from app.models import User
-from app.routers import auth, redirect, urls, users
+from app.core.db import close_db, init_db
+from app.core.snapshot import hot_links_builder
+from app.core.startup import (
+    LazyRoutersMiddleware,
+    StartupTimer,
+    ensure_superuser,
+    import_api_routers,
+    include_api_routers,
+)
+from app.core.visits import visit_counter
+from app.routers import metrics, redirect
+
+# Uvicorn configures its own loggers only, log the startup report through them
+logger = logging.getLogger("uvicorn.error")
+
+startup_timer = StartupTimer()
+api_routers_loaded = asyncio.Event()
+
+
+async def load_api_routers(app: FastAPI) -> None:
+    try:
+        # Imported off the event loop, loading the rest of the API blocks it for
+        # ~55ms otherwise, see `app.core.startup.import_api_routers`
+        with startup_timer.phase("lazy_routers"):
+            await asyncio.to_thread(import_api_routers)
+            include_api_routers(app)
+        logger.info(startup_timer.report())
+    finally:
+        # Never leave API requests waiting, even if loading failed
+        api_routers_loaded.set()
+
+
+def log_task_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and (exc := task.exception()):
+        logger.error("Startup task %s failed", task.get_name(), exc_info=exc)
 
 
 @asynccontextmanager
-async def lifespan(_app: FastAPI) -> AsyncGenerator[None]:
-    await init_db()
-
-    superuser = await User.find(
-        {
-            "username": {
-                "$regex": f"^{re.escape(config.first_superuser)}$",
-                "$options": "i",
-            },
-            "email": {
-                "$regex": f"^{re.escape(config.first_superuser_email)}$",
-                "$options": "i",
-            },
-        }
-    ).first_or_none()
-    if not superuser:
-        await User(
-            username=config.first_superuser,
-            email=config.first_superuser_email.lower(),
-            password_hash=hash_password(
-                config.first_superuser_password.get_secret_value()
-            ),
-            is_superuser=True,
-        ).insert()
+async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
+    background_tasks: list[asyncio.Task] = []
+
+    with startup_timer.phase("init_db"):
+        await init_db()
+
+    if config.defer_superuser_bootstrap:
+        background_tasks.append(
+            asyncio.create_task(ensure_superuser(), name="ensure_superuser")
+        )
+    else:
+        with startup_timer.phase("superuser"):
+            await ensure_superuser()
+
+    background_tasks.append(
+        asyncio.create_task(bulk_jobs.fail_stale_jobs(), name="fail_stale_jobs")
+    )
+
+    visit_counter.start()
+    click_tracker.start()
+    if config.hot_link_snapshot_path:
+        hot_links_builder.start()
+    if config.ident_filter_enabled:
+        ident_filter.start()
+
+    if config.lazy_routers:
+        background_tasks.append(
+            asyncio.create_task(load_api_routers(app), name="load_api_routers")
+        )
+    for task in background_tasks:
+        task.add_done_callback(log_task_failure)
+
+    logger.info(startup_timer.report())
 
     yield
 
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await bulk_jobs.stop()
+    await hot_links_builder.stop()
+    await ident_filter.stop()
+    await click_tracker.stop()
+    await visit_counter.stop()
+    # Imported lazily, see `app.core.startup.ensure_superuser`
+    from app.core.security import password_hash_pool
+
+    password_hash_pool.shutdown()
+    await close_db()
+
 
 app = FastAPI(
     title="URL shortener RESTful API",
@@ -47,6 +105,10 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Added first so it runs inside the CORS and metrics middleware
+if config.fast_redirects:
+    app.add_middleware(redirect.RedirectMiddleware)  # ty:ignore[invalid-argument-type]
+
 # Set all CORS enabled origins
 if config.all_cors_origins:
     from fastapi.middleware.cors import CORSMiddleware
@@ -60,7 +122,20 @@ if config.all_cors_origins:
     )
 
 
-app.include_router(auth.router)
-app.include_router(users.router)
-app.include_router(urls.router)
+if config.metrics_enabled:
+    from app.core.metrics import MetricsMiddleware
+
+    app.add_middleware(MetricsMiddleware)  # ty:ignore[invalid-argument-type]
+    if config.metrics_token:
+        app.include_router(metrics.router)
+
+if config.lazy_routers:
+    app.add_middleware(
+        LazyRoutersMiddleware,  # ty:ignore[invalid-argument-type]
+        loaded=api_routers_loaded,
+    )
+else:
+    include_api_routers(app)
 app.include_router(redirect.router)
+
+startup_timer.record("import", time.perf_counter() - import_started_at)
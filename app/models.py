@@ -1,10 +1,18 @@
 import re
+from dataclasses import dataclass
 from datetime import UTC, datetime
 from enum import Enum
 from functools import partial
-from typing import Annotated, TypeVar
-
-from beanie import Document, Indexed, PydanticObjectId, SortDirection
+from typing import Annotated, ClassVar, Literal, Self, TypeVar
+
+from beanie import (
+    Document,
+    Granularity,
+    Indexed,
+    PydanticObjectId,
+    SortDirection,
+    TimeSeriesConfig,
+)
 from pydantic import (
     AfterValidator,
     AnyUrl,
@@ -13,23 +21,32 @@ from pydantic import (
     EmailStr,
     Field,
     StringConstraints,
+    model_validator,
 )
 from pydantic.generics import GenericModel
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from slugify import slugify
 
+from app.core.config import config
+
 SchemaType = TypeVar("SchemaType", bound=BaseModel)
 
 
 class Paginated[SchemaType](GenericModel):
     page: int
     per_page: int
-    total: int
+    total: int | None = None
+    next_cursor: str | None = None
     results: list[SchemaType]
 
 
 class PaginationParams(BaseModel):
     page: Annotated[int, Field(ge=1)] = 1
     per_page: Annotated[int, Field(ge=1, le=100)] = 10
+    # Opaque keyset cursor from a previous page's `next_cursor`, `page` is ignored
+    # when it's set
+    cursor: str | None = None
+    include_total: bool = True
 
     @property
     def skip(self) -> int:
@@ -53,6 +70,15 @@ class SortOrder(Enum):
         return SortDirection(int(self))
 
 
+class ExportFormat(Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    @property
+    def media_type(self) -> str:
+        return "application/x-ndjson" if self is ExportFormat.NDJSON else "text/csv"
+
+
 class SortingParams(BaseModel):
     sort: str = "created_at"
     order: SortOrder = SortOrder.ASC
@@ -74,17 +100,33 @@ class User(Document):
     class Settings:
         name = "users"
         use_state_management = True
+        indexes: ClassVar = [
+            IndexModel([("created_at", ASCENDING), ("_id", ASCENDING)]),
+        ]
 
     username: Annotated[ConstrainedUsername, Indexed(unique=True)]
     email: Annotated[EmailStr, Indexed(unique=True)]
     password_hash: str
     is_active: bool = True
     is_superuser: bool = False
+    # Bumped to revoke every access token issued before, see `app.deps`
+    token_version: int = 0
     created_at: Annotated[
         datetime, Field(default_factory=partial(datetime.now, tz=UTC))
     ]
 
 
+@dataclass(slots=True, frozen=True)
+class Principal:
+    """The authenticated user as far as authorization is concerned."""
+
+    id: PydanticObjectId
+    username: str
+    is_active: bool
+    is_superuser: bool
+    token_version: int = 0
+
+
 class UserBase(BaseModel):
     username: Annotated[str, Field(min_length=3, max_length=64)]
     email: EmailStr
@@ -122,14 +164,43 @@ class Token(BaseModel):
     token_type: str
 
 
+# Permanent (301) or temporary (302, 307) redirect
+RedirectStatus = Literal[301, 302, 307]
+CacheMaxAge = Annotated[
+    int | None, Field(ge=0, le=config.redirect_max_age_limit_seconds)
+]
+
+
 class ShortUrl(Document):
     class Settings:
         name = "urls"
         use_state_management = True
+        # Back keyset pagination of a user's short URLs, see `app.pagination`
+        indexes: ClassVar = [
+            IndexModel(
+                [("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]
+            ),
+            IndexModel(
+                [("user_id", ASCENDING), ("views", ASCENDING), ("_id", ASCENDING)]
+            ),
+            IndexModel([("created_at", ASCENDING), ("_id", ASCENDING)]),
+            # Finds a user's existing link for an origin, see `app.utils.hash_origin`
+            IndexModel([("user_id", ASCENDING), ("origin_hash", ASCENDING)]),
+            # Top-K trending links, per user and overall, see `app.core.trending`
+            IndexModel([("user_id", ASCENDING), ("trend_score", DESCENDING)]),
+            IndexModel([("trend_score", DESCENDING)]),
+            # Most visited links, and those visited since the last incremental
+            # refresh, see `app.core.snapshot`
+            IndexModel([("views", DESCENDING)]),
+            IndexModel([("last_visit_at", ASCENDING)]),
+        ]
 
     ident: Annotated[str, Indexed(unique=True)]
     origin: str
+    origin_hash: int | None = None
     views: int = 0
+    # Log2 of the forward decayed visit count, see `app.core.trending`
+    trend_score: float | None = None
     created_at: Annotated[
         datetime, Field(default_factory=partial(datetime.now, tz=UTC))
     ]
@@ -137,12 +208,59 @@ class ShortUrl(Document):
     last_visit_at: datetime | None = None
     slug: Annotated[str, Indexed(unique=True)]
     user_id: PydanticObjectId
+    # Redirect policy, see `app.routers.redirect.get_cache_headers`
+    redirect_status: RedirectStatus = 307
+    cache_max_age: CacheMaxAge = None
+    analytics: bool = True
+    # Deactivated links are kept but no longer redirect, see `app.core.bulk`
+    is_active: bool = True
+
+
+class ArchivedShortUrl(Document):
+    """Inactive short URL moved out of `urls`, see `app.core.archive`.
+
+    Keyed by ident so the only indexes are `_id` and the one keeping archived
+    slugs reserved.
+    """
+
+    class Settings:
+        name = "urls_archive"
+
+    id: str  # ty:ignore[invalid-assignment]  # pyrefly: ignore[bad-override-mutable-attribute]
+    url_id: PydanticObjectId
+    origin: str
+    views: int = 0
+    created_at: datetime
+    last_visit_at: datetime | None = None
+    slug: Annotated[str, Indexed(unique=True)]
+    user_id: PydanticObjectId
+    archived_at: datetime
+
+
+class ShortUrlTombstone(Document):
+    """Ident of a short URL deleted or archived, keyed by ident.
+
+    Lets the hot link snapshot drop links removed since its last refresh, see
+    `app.core.snapshot`.
+    """
+
+    class Settings:
+        name = "urls_tombstones"
+
+    id: str  # ty:ignore[invalid-assignment]  # pyrefly: ignore[bad-override-mutable-attribute]
+    # Only needed until the next snapshot refresh
+    deleted_at: Annotated[datetime, Indexed(expireAfterSeconds=86_400)]
 
 
 class ShortUrlIn(BaseModel):
     url: AnyUrl
     slug: Annotated[str, Field(min_length=1, max_length=64), AfterValidator(slugify)]
     expiration_days: Annotated[float | None, Field(ge=0.0)] = None
+    redirect_status: RedirectStatus = 307
+    # Seconds browsers and CDNs may cache the redirect for, capped by the
+    # expiration date and, for links with analytics, by a short global limit
+    cache_max_age: CacheMaxAge = None
+    analytics: bool = True
 
 
 class ShortUrlOut(BaseModel):
@@ -155,10 +273,196 @@ class ShortUrlOut(BaseModel):
     expires_at: datetime | None = None
     last_visit_at: datetime | None = None
     slug: str
+    redirect_status: RedirectStatus = 307
+    cache_max_age: int | None = None
+    analytics: bool = True
+    is_active: bool = True
 
 
 class ShortUrlOutPrivate(ShortUrlOut):
     user_id: PydanticObjectId
 
 
-__beanie_models__ = [User, ShortUrl]
+class TrendingShortUrlOut(ShortUrlOut):
+    # Visits decayed by their age, a visit counts half after each half-life
+    score: float
+
+
+class TrendingShortUrlOutPrivate(ShortUrlOutPrivate):
+    score: float
+
+
+ShortUrlBatchIn = Annotated[
+    list[ShortUrlIn], Field(min_length=1, max_length=config.shorten_batch_max_size)
+]
+
+
+class ShortUrlBatchResult(BaseModel):
+    index: int
+    short_url: ShortUrlOut | None = None
+    error: str | None = None
+
+
+class ShortUrlBatchOut(BaseModel):
+    created: int
+    failed: int
+    results: list[ShortUrlBatchResult]
+
+
+class IdCounter(Document):
+    class Settings:
+        name = "counters"
+
+    id: str  # ty:ignore[invalid-assignment]  # pyrefly: ignore[bad-override-mutable-attribute]
+    value: int = 0
+
+
+class UserAgentClass(Enum):
+    DESKTOP = "desktop"
+    MOBILE = "mobile"
+    BOT = "bot"
+    OTHER = "other"
+
+
+class Click(Document):
+    class Settings:
+        name = "clicks"
+        timeseries = TimeSeriesConfig(
+            time_field="timestamp",
+            meta_field="ident",
+            granularity=Granularity.seconds,
+            expire_after_seconds=int(config.click_retention_days * 24 * 60 * 60),
+        )
+
+    ident: str
+    timestamp: datetime
+    referrer_host: str | None = None
+    user_agent_class: UserAgentClass = UserAgentClass.OTHER
+
+
+class RollupPeriod(Enum):
+    HOUR = "hour"
+    DAY = "day"
+
+
+class ClickRollup(Document):
+    class Settings:
+        name = "click_rollups"
+        indexes: ClassVar = [
+            IndexModel(
+                [("ident", ASCENDING), ("period", ASCENDING), ("bucket", ASCENDING)],
+                unique=True,
+            )
+        ]
+
+    ident: str
+    period: RollupPeriod
+    bucket: datetime
+    clicks: int = 0
+
+
+class ClickRollupOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    bucket: datetime
+    clicks: int
+
+
+class ShortUrlStats(BaseModel):
+    ident: str
+    period: RollupPeriod
+    total: int
+    results: list[ClickRollupOut]
+
+
+class ShortUrlFilter(BaseModel):
+    """Selects short URLs for a bulk operation, criteria are combined with AND."""
+
+    user_id: PydanticObjectId | None = None
+    # Matches the domain and its subdomains
+    origin_domain: str | None = None
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    zero_views: bool = False
+
+    @model_validator(mode="after")
+    def check_not_empty(self) -> Self:
+        # Guards against deleting every short URL by accident
+        if not any(self.model_dump().values()):
+            raise ValueError("At least one filter is required")
+
+        return self
+
+
+class BulkAction(Enum):
+    DELETE_URLS = "delete_urls"
+    DEACTIVATE_URLS = "deactivate_urls"
+    DELETE_USER = "delete_user"
+
+
+class JobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class BulkJob(Document):
+    """Progress of a bulk admin operation, see `app.core.bulk`."""
+
+    class Settings:
+        name = "bulk_jobs"
+        use_state_management = True
+
+    action: BulkAction
+    # The filter as submitted, for reference
+    criteria: dict
+    status: JobStatus = JobStatus.PENDING
+    matched: int | None = None
+    processed: int = 0
+    error: str | None = None
+    created_at: Annotated[
+        datetime, Field(default_factory=partial(datetime.now, tz=UTC))
+    ]
+    updated_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+class BulkJobOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: PydanticObjectId
+    action: BulkAction
+    criteria: dict
+    status: JobStatus
+    matched: int | None
+    processed: int
+    error: str | None
+    created_at: datetime
+    finished_at: datetime | None
+
+
+class RateLimitBucket(Document):
+    """Token bucket shared by all workers, see `MongoRateLimitBackend`."""
+
+    class Settings:
+        name = "rate_limits"
+        indexes: ClassVar = [IndexModel("expires_at", expireAfterSeconds=0)]
+
+    id: str  # ty:ignore[invalid-assignment]  # pyrefly: ignore[bad-override-mutable-attribute]
+    tokens: float
+    updated_at: datetime
+    expires_at: datetime
+
+
+__beanie_models__ = [
+    User,
+    ShortUrl,
+    ArchivedShortUrl,
+    ShortUrlTombstone,
+    IdCounter,
+    Click,
+    ClickRollup,
+    RateLimitBucket,
+    BulkJob,
+]
@@ -1,13 +1,14 @@
-import re
 from datetime import timedelta
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app.core.config import config
+from app.core.ratelimit import get_client_ip, token_rate_limiter
 from app.core.security import create_access_token, verify_password
 from app.models import Token, User
+from app.utils import normalize_username
 
 router = APIRouter(tags=["auth"])
 
@@ -15,16 +16,25 @@ router = APIRouter(tags=["auth"])
 @router.post("/token")
 async def login_for_access_token(
     *,
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
-    # Look up user by email (case-insensitive)
+    # Throttle before hashing, per client and per account tried by that client.
+    # An account-wide bucket would let anyone lock its owner out of logging in
+    client_ip = get_client_ip(request)
+    await token_rate_limiter.check(
+        f"ip:{client_ip}",
+        f"login:{client_ip}:{normalize_username(form_data.username)}",
+    )
+
+    # Look up user by username (case-insensitive)
     user = await User.find(
-        {"username": {"$regex": f"^{re.escape(form_data.username)}$", "$options": "i"}},
+        User.username == normalize_username(form_data.username),
         User.is_active,
     ).first_or_none()
     # Verify user exists and password is correct
     # Don't reveal which one failed (security best practice)
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -34,7 +44,13 @@ async def login_for_access_token(
     # Create access token with user id as subject
     access_token_expires = timedelta(minutes=config.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.username},
+        data={
+            "sub": user.username,
+            "uid": str(user.id),
+            "act": user.is_active,
+            "su": user.is_superuser,
+            "ver": user.token_version,
+        },
         expires_delta=access_token_expires,
     )
 
@@ -0,0 +1,21 @@
+from beanie import PydanticObjectId
+from fastapi import APIRouter, HTTPException, status
+
+from app.deps import CurrentActiveSuperUserDep
+from app.models import BulkJob, BulkJobOut
+
+router = APIRouter(prefix="/jobs", tags=["admin"])
+
+
+@router.get("/{job_id}", response_model=BulkJobOut)
+async def read_job(
+    *, _superuser: CurrentActiveSuperUserDep, job_id: PydanticObjectId
+) -> BulkJob:
+    job = await BulkJob.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with id {str(job_id)!r} not found",
+        )
+
+    return job
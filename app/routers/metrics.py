@@ -0,0 +1,34 @@
+import secrets
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import config
+from app.core.metrics import registry
+
+
+async def check_metrics_token(
+    authorization: Annotated[str | None, Header()] = None,
+) -> None:
+    token = config.metrics_token.get_secret_value() if config.metrics_token else ""
+    if not (
+        token
+        and authorization
+        and secrets.compare_digest(authorization.encode(), f"Bearer {token}".encode())
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+router = APIRouter(include_in_schema=False, dependencies=[Depends(check_metrics_token)])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
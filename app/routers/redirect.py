@@ -1,9 +1,20 @@
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException, status
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import JSONResponse, RedirectResponse, Response
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from app.models import ShortUrl
+from app.core.analytics import click_tracker
+from app.core.archive import restore_short_url
+from app.core.bloom import ident_filter
+from app.core.cache import CACHED_SHORT_URL_FIELDS, CachedShortUrl, redirect_cache
+from app.core.config import config
+from app.core.db import get_redirect_collection
+from app.core.ratelimit import get_client_ip, redirect_rate_limiter
+from app.core.snapshot import hot_links
+from app.core.visits import visit_counter
 
 router = APIRouter(
     prefix="/redirect",
@@ -13,27 +24,140 @@ router = APIRouter(
 )
 
 
-async def update_short_url_visit_count(*, short_url: ShortUrl) -> None:
-    short_url.views += 1
-    short_url.last_visit_at = datetime.now(tz=UTC)
+async def find_short_url_target(ident: str) -> CachedShortUrl | None:
+    """Looks up only the redirect target, skipping Beanie document hydration."""
+    document = await get_redirect_collection().find_one(
+        {"ident": ident},
+        {
+            "_id": False,
+            "is_active": True,
+            **dict.fromkeys(CACHED_SHORT_URL_FIELDS, True),
+        },
+    )
+    if document is None:
+        # Inactive links are moved to the archive, bring them back on access
+        document = await restore_short_url(ident)
+    # Deactivated links are treated as missing, archived ones included
+    if document is None or not document.get("is_active", True):
+        return None
 
-    await short_url.save_changes()
+    return CachedShortUrl.from_document(document)
 
 
-@router.get("/{ident}")
-async def redirect_by_ident(*, worker: BackgroundTasks, ident: str) -> RedirectResponse:
-    short_url = await ShortUrl.find(ShortUrl.ident == ident).first_or_none()
+async def get_cached_short_url(ident: str) -> CachedShortUrl | None:
+    found, cached_short_url = redirect_cache.get(ident)
+    if found:
+        return cached_short_url
+
+    # The shared snapshot can lag behind, so expired links (which may have been
+    # refreshed since) are looked up in the database
+    cached_short_url = hot_links.lookup(ident)
+    if cached_short_url is None:
+        # Idents the filter has never seen 404 without a query. The filter syncs
+        # new links with a delay, so its misses aren't cached
+        if not ident_filter.might_exist(ident):
+            return None
+        cached_short_url = await find_short_url_target(ident)
+    elif cached_short_url.expires_at and cached_short_url.expires_at < (
+        datetime.now(tz=UTC)
+    ):
+        cached_short_url = await find_short_url_target(ident)
+    redirect_cache.set(ident, cached_short_url)
+
+    return cached_short_url
+
+
+def get_cache_headers(short_url: CachedShortUrl, now: datetime) -> dict[str, str]:
+    """Lets browsers and CDNs cache the redirect for the link's max-age.
+
+    The max-age never outlives the link's expiration date, and is kept short for
+    links with analytics since cached redirects never reach us.
+    """
+    max_age = (
+        config.redirect_default_max_age_seconds
+        if short_url.max_age is None
+        else short_url.max_age
+    )
+    if short_url.analytics:
+        max_age = min(max_age, config.redirect_analytics_max_age_seconds)
+    if short_url.expires_at:
+        max_age = min(max_age, int((short_url.expires_at - now).total_seconds()))
+
+    if max_age <= 0:
+        return {"Cache-Control": "no-store"}
+
+    return {
+        "Cache-Control": f"public, max-age={max_age}",
+        "Expires": format_datetime(now + timedelta(seconds=max_age), usegmt=True),
+    }
+
+
+async def redirect_to_origin(
+    connection: HTTPConnection, ident: str
+) -> RedirectResponse:
+    await redirect_rate_limiter.check(f"ip:{get_client_ip(connection)}")
+
+    short_url = await get_cached_short_url(ident)
     if not short_url:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Short URL with identifier {ident!r} not found",
         )
-    if short_url.expires_at and short_url.expires_at < datetime.now(tz=UTC):
+    now = datetime.now(tz=UTC)
+    if short_url.expires_at and short_url.expires_at < now:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
             detail=f"Short URL with identifier {ident!r} has expired",
         )
 
-    worker.add_task(update_short_url_visit_count, short_url=short_url)
+    visit_counter.record(ident)
+    if short_url.analytics:
+        click_tracker.track(
+            ident,
+            referrer=connection.headers.get("referer"),
+            user_agent=connection.headers.get("user-agent"),
+        )
+
+    return RedirectResponse(
+        url=short_url.origin,
+        status_code=short_url.status_code,
+        headers=get_cache_headers(short_url, now),
+    )
+
+
+@router.get("/{ident}")
+async def redirect_by_ident(*, request: Request, ident: str) -> RedirectResponse:
+    return await redirect_to_origin(request, ident)
+
+
+class RedirectMiddleware:
+    """Serves `GET /redirect/{ident}` without going through FastAPI.
+
+    Skips routing, dependency resolution and the exception handler machinery,
+    errors are rendered the same way FastAPI renders an `HTTPException`. Every
+    other request, including malformed redirect paths, is passed on to the app.
+    """
+
+    def __init__(self, app: ASGIApp, *, redirect_prefix: str = "/redirect") -> None:
+        self.app = app
+        self.path_prefix = f"{redirect_prefix}/"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["method"] == "GET":
+            path: str = scope["path"]
+            ident = path[len(self.path_prefix) :]
+            if path.startswith(self.path_prefix) and ident and "/" not in ident:
+                try:
+                    response: Response = await redirect_to_origin(
+                        HTTPConnection(scope), ident
+                    )
+                except HTTPException as e:
+                    response = JSONResponse(
+                        {"detail": e.detail},
+                        status_code=e.status_code,
+                        headers=e.headers,
+                    )
+                await response(scope, receive, send)
+                return
 
-    return RedirectResponse(url=short_url.origin)
+        await self.app(scope, receive, send)
@@ -1,84 +1,290 @@
+from collections.abc import Mapping
 from datetime import UTC, datetime, timedelta
+from functools import partial
+from typing import Annotated
 
-from fastapi import APIRouter, HTTPException, status
+from beanie import PydanticObjectId, SortDirection
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
-from app.core.config import config
+from app.core.archive import DUPLICATE_KEY_ERROR
+from app.core.bloom import ident_filter
+from app.core.bulk import bulk_jobs, get_short_url_query
+from app.core.cache import redirect_cache
+from app.core.export import SHORT_URL_EXPORT_FIELDS, stream_short_urls
+from app.core.idents import ident_generator
+from app.core.snapshot import record_tombstones
+from app.core.trending import find_trending_short_urls
 from app.deps import (
+    CurrentActivePrincipalDep,
     CurrentActiveSuperUserDep,
-    CurrentActiveUserDep,
+    ExportFormatDep,
     PaginationParamsDep,
     SortParamsDep,
+    TrendingLimitDep,
+    charge_shorten_rate_limit,
+    check_shorten_rate_limit,
 )
 from app.models import (
+    ArchivedShortUrl,
+    BulkAction,
+    BulkJob,
+    BulkJobOut,
+    ClickRollup,
+    ExportFormat,
     Paginated,
+    RollupPeriod,
     ShortUrl,
+    ShortUrlBatchIn,
+    ShortUrlBatchOut,
+    ShortUrlBatchResult,
+    ShortUrlFilter,
     ShortUrlIn,
     ShortUrlOut,
     ShortUrlOutPrivate,
+    ShortUrlStats,
+    TrendingShortUrlOutPrivate,
 )
-from app.utils import generate_url_ident
+from app.pagination import paginate
+from app.utils import canonicalize_origin, hash_origin
 
 router = APIRouter(tags=["urls"])
 
+duplicate_slug_error = "The URL associated with this slug already exists"
+duplicate_ident_error = "Failed to generate a unique identifier, please retry"
 
-@router.post(
-    "/shorten", status_code=status.HTTP_201_CREATED, response_model=ShortUrlOut
-)
-async def create_short_url(
-    *, user: CurrentActiveUserDep, short_url_in: ShortUrlIn
-) -> ShortUrl:
-    existing_short_url = await ShortUrl.find(
-        ShortUrl.slug == short_url_in.slug
-    ).first_or_none()
-    if existing_short_url:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="The URL associated with this slug already exists",
-        )
 
-    origin = str(short_url_in.url)
+def get_duplicate_key_error(details: Mapping) -> str:
+    """Returns the error for a duplicate key write error's `details`.
+
+    Slugs are taken by concurrent requests since they were checked, idents
+    (rarely) collide when they're random.
+    """
+    if "slug" in details.get("keyPattern", {"slug": 1}):
+        return duplicate_slug_error
+
+    return duplicate_ident_error
+
+
+def build_short_url(
+    short_url_in: ShortUrlIn, *, ident: str, user_id: PydanticObjectId
+) -> ShortUrl:
     expires_at = (
         (datetime.now(tz=UTC) + timedelta(days=short_url_in.expiration_days))
         if short_url_in.expiration_days
         else None
     )
 
-    short_url = ShortUrl(
+    origin = str(short_url_in.url)
+    return ShortUrl(
         **short_url_in.model_dump(
             exclude={"url", "expiration_days"},
         ),
-        ident=generate_url_ident(origin, config.url_ident_length),
+        ident=ident,
         origin=origin,
+        origin_hash=hash_origin(origin),
         expires_at=expires_at,
-        user_id=user.id,
+        user_id=user_id,
     )
-    await short_url.insert()
+
+
+async def find_reusable_short_url(
+    short_url_in: ShortUrlIn, *, user_id: PydanticObjectId
+) -> ShortUrl | None:
+    """Returns the user's active, unexpired short URL for the same canonical origin."""
+    origin = canonicalize_origin(str(short_url_in.url))
+    candidates = ShortUrl.find(
+        ShortUrl.user_id == user_id,
+        ShortUrl.origin_hash == hash_origin(origin),
+        {
+            "is_active": {"$ne": False},
+            "$or": [
+                {"expires_at": None},
+                {"expires_at": {"$gt": datetime.now(tz=UTC)}},
+            ],
+        },
+    )
+    # Rules out hash collisions
+    async for candidate in candidates:
+        if canonicalize_origin(candidate.origin) == origin:
+            return candidate
+
+    return None
+
+
+@router.post(
+    "/shorten",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ShortUrlOut,
+    dependencies=[Depends(check_shorten_rate_limit)],
+)
+async def create_short_url(
+    *,
+    user: CurrentActivePrincipalDep,
+    short_url_in: ShortUrlIn,
+    response: Response,
+    reuse: Annotated[
+        bool,
+        Query(
+            description=(
+                "Return your existing short URL for the same origin, if any, "
+                "instead of creating a new one"
+            )
+        ),
+    ] = False,
+) -> ShortUrl:
+    if reuse:
+        existing_short_url = await find_reusable_short_url(
+            short_url_in, user_id=user.id
+        )
+        if existing_short_url:
+            response.status_code = status.HTTP_200_OK
+            return existing_short_url
+
+    # Archived links keep their slugs, they're restored when visited
+    existing_short_url = (
+        await ShortUrl.find(ShortUrl.slug == short_url_in.slug).first_or_none()
+        or await ArchivedShortUrl.find(
+            ArchivedShortUrl.slug == short_url_in.slug
+        ).first_or_none()
+    )
+    if existing_short_url:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=duplicate_slug_error,
+        )
+
+    short_url = build_short_url(
+        short_url_in, ident=await ident_generator.next_ident(), user_id=user.id
+    )
+    try:
+        await short_url.insert()
+    except DuplicateKeyError as e:
+        detail = get_duplicate_key_error(e.details or {})
+        raise HTTPException(
+            status_code=(
+                status.HTTP_400_BAD_REQUEST
+                if detail == duplicate_slug_error
+                else status.HTTP_409_CONFLICT
+            ),
+            detail=detail,
+        ) from e
+    redirect_cache.invalidate(short_url.ident)
+    ident_filter.add(short_url.ident)
 
     return short_url
 
 
+@router.post(
+    "/shorten/batch",
+    response_model=ShortUrlBatchOut,
+)
+async def create_short_urls(
+    *, request: Request, user: CurrentActivePrincipalDep, short_urls_in: ShortUrlBatchIn
+) -> ShortUrlBatchOut:
+    # Charged per link, so batching isn't a way around the limit
+    await charge_shorten_rate_limit(request, user, cost=len(short_urls_in))
+
+    # Check every slug with a single query, the first occurrence of a slug
+    # within the batch wins
+    slugs = {short_url_in.slug for short_url_in in short_urls_in}
+    taken_slugs = {
+        document["slug"]
+        for collection in (
+            ShortUrl.get_pymongo_collection(),
+            ArchivedShortUrl.get_pymongo_collection(),
+        )
+        async for document in collection.find(
+            {"slug": {"$in": list(slugs)}}, {"_id": False, "slug": True}
+        )
+    }
+
+    errors: dict[int, str] = {}
+    accepted: list[tuple[int, ShortUrlIn]] = []
+    for index, short_url_in in enumerate(short_urls_in):
+        if short_url_in.slug in taken_slugs:
+            errors[index] = duplicate_slug_error
+            continue
+
+        taken_slugs.add(short_url_in.slug)
+        accepted.append((index, short_url_in))
+
+    idents = await ident_generator.next_idents(len(accepted))
+    short_urls = {
+        index: build_short_url(short_url_in, ident=ident, user_id=user.id)
+        for (index, short_url_in), ident in zip(accepted, idents, strict=True)
+    }
+
+    if short_urls:
+        indexes = list(short_urls)
+        try:
+            await ShortUrl.insert_many(short_urls.values(), ordered=False)
+        except BulkWriteError as e:
+            write_errors = e.details["writeErrors"]
+            if any(
+                write_error["code"] != DUPLICATE_KEY_ERROR
+                for write_error in write_errors
+            ):
+                raise
+
+            for write_error in write_errors:
+                index = indexes[write_error["index"]]
+                errors[index] = get_duplicate_key_error(write_error)
+                del short_urls[index]
+
+    for short_url in short_urls.values():
+        redirect_cache.invalidate(short_url.ident)
+        ident_filter.add(short_url.ident)
+
+    return ShortUrlBatchOut(
+        created=len(short_urls),
+        failed=len(errors),
+        results=[
+            ShortUrlBatchResult(
+                index=index,
+                short_url=short_urls.get(index),
+                error=errors.get(index),
+            )
+            for index in range(len(short_urls_in))
+        ],
+    )
+
+
 @router.get("/urls", tags=["admin"], response_model=Paginated[ShortUrlOutPrivate])
 async def read_short_urls(
     *,
     _superuser: CurrentActiveSuperUserDep,
     pagination_params: PaginationParamsDep,
     sort_params: SortParamsDep,
-) -> Paginated:
-    short_urls_query = ShortUrl.find()
-
-    short_urls = (
-        await short_urls_query.skip(pagination_params.skip)
-        .limit(pagination_params.limit)
-        .sort((sort_params.sort, sort_params.order.direction))
-        .to_list()
+) -> Response:
+    return await paginate(
+        ShortUrl.find(), pagination_params, sort_params, model=ShortUrlOutPrivate
+    )
+
+
+@router.get("/urls/export", tags=["admin"], response_class=StreamingResponse)
+async def export_short_urls(
+    *,
+    _superuser: CurrentActiveSuperUserDep,
+    export_format: ExportFormatDep = ExportFormat.NDJSON,
+) -> StreamingResponse:
+    return stream_short_urls(
+        {},
+        export_format=export_format,
+        fields=[*SHORT_URL_EXPORT_FIELDS, "user_id"],
+        filename="urls",
     )
-    total_count = await short_urls_query.count()
 
-    return Paginated(
-        page=pagination_params.page,
-        per_page=pagination_params.per_page,
-        total=total_count,
-        results=short_urls,
+
+@router.get(
+    "/urls/trending", tags=["admin"], response_model=list[TrendingShortUrlOutPrivate]
+)
+async def read_trending_short_urls(
+    *, _superuser: CurrentActiveSuperUserDep, limit: TrendingLimitDep = 10
+) -> list[dict]:
+    return await find_trending_short_urls(
+        {}, limit=limit, model=TrendingShortUrlOutPrivate
     )
 
 
@@ -96,8 +302,43 @@ async def read_short_url(
     return short_url
 
 
+@router.get("/urls/{ident}/stats", response_model=ShortUrlStats)
+async def read_short_url_stats(
+    *,
+    user: CurrentActivePrincipalDep,
+    ident: str,
+    period: RollupPeriod = RollupPeriod.HOUR,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> ShortUrlStats:
+    short_url_query = ShortUrl.find(ShortUrl.ident == ident)
+    if not user.is_superuser:
+        short_url_query = short_url_query.find(ShortUrl.user_id == user.id)
+    if not await short_url_query.exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Short URL with identifier {ident!r} not found",
+        )
+
+    rollups_query = ClickRollup.find(
+        ClickRollup.ident == ident, ClickRollup.period == period
+    )
+    if since:
+        rollups_query = rollups_query.find(ClickRollup.bucket >= since)
+    if until:
+        rollups_query = rollups_query.find(ClickRollup.bucket < until)
+    rollups = await rollups_query.sort(("bucket", SortDirection.ASCENDING)).to_list()
+
+    return ShortUrlStats(
+        ident=ident,
+        period=period,
+        total=sum(rollup.clicks for rollup in rollups),
+        results=rollups,
+    )
+
+
 @router.patch("/urls/{ident}/refresh", response_model=ShortUrlOut)
-async def refresh_short_url(*, user: CurrentActiveUserDep, ident: str) -> ShortUrl:
+async def refresh_short_url(*, user: CurrentActivePrincipalDep, ident: str) -> ShortUrl:
     short_url = await ShortUrl.find(
         ShortUrl.ident == ident, ShortUrl.user_id == user.id
     ).first_or_none()
@@ -112,6 +353,7 @@ async def refresh_short_url(*, user: CurrentActiveUserDep, ident: str) -> ShortU
         short_url.expires_at = datetime.now(tz=UTC) + previous_expires_at
 
         await short_url.save_changes()
+        redirect_cache.invalidate(short_url.ident)
 
     return short_url
 
@@ -120,11 +362,55 @@ async def refresh_short_url(*, user: CurrentActiveUserDep, ident: str) -> ShortU
 async def delete_short_url(
     *, _superuser: CurrentActiveSuperUserDep, ident: str
 ) -> None:
-    short_url = await ShortUrl.find(ShortUrl.ident == ident).first_or_none()
-    if not short_url:
+    result = await ShortUrl.get_pymongo_collection().delete_one({"ident": ident})
+    # Archived links would be restored on their next visit
+    archived_result = await ArchivedShortUrl.get_pymongo_collection().delete_one(
+        {"_id": ident}
+    )
+    if not result.deleted_count and not archived_result.deleted_count:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Short URL with identifier {ident!r} not found",
         )
 
-    await short_url.delete()
+    await record_tombstones([ident])
+    redirect_cache.invalidate(ident)
+
+
+@router.post(
+    "/urls/bulk-delete",
+    tags=["admin"],
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=BulkJobOut,
+)
+async def bulk_delete_short_urls(
+    *, _superuser: CurrentActiveSuperUserDep, short_url_filter: ShortUrlFilter
+) -> BulkJob:
+    """Deletes matching short URLs in the background, poll `/jobs/{job_id}`."""
+    return await bulk_jobs.submit(
+        BulkAction.DELETE_URLS,
+        short_url_filter.model_dump(mode="json", exclude_defaults=True),
+        partial(
+            bulk_jobs.delete_short_urls, query=get_short_url_query(short_url_filter)
+        ),
+    )
+
+
+@router.post(
+    "/urls/bulk-deactivate",
+    tags=["admin"],
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=BulkJobOut,
+)
+async def bulk_deactivate_short_urls(
+    *, _superuser: CurrentActiveSuperUserDep, short_url_filter: ShortUrlFilter
+) -> BulkJob:
+    """Deactivates matching short URLs in the background, poll `/jobs/{job_id}`."""
+    return await bulk_jobs.submit(
+        BulkAction.DEACTIVATE_URLS,
+        short_url_filter.model_dump(mode="json", exclude_defaults=True),
+        partial(
+            bulk_jobs.deactivate_short_urls,
+            query=get_short_url_query(short_url_filter),
+        ),
+    )
@@ -1,25 +1,42 @@
-import re
+from functools import partial
 
-from beanie import SortDirection
+from beanie import PydanticObjectId
 from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import Response, StreamingResponse
 
+from app.core.bulk import bulk_jobs
+from app.core.cache import principal_cache, token_version_cache
+from app.core.export import SHORT_URL_EXPORT_FIELDS, stream_short_urls
 from app.core.security import hash_password
+from app.core.trending import find_trending_short_urls
 from app.deps import (
+    CurrentActivePrincipalDep,
     CurrentActiveSuperUserDep,
     CurrentActiveUserDep,
+    ExportFormatDep,
     PaginationParamsDep,
     SortParamsDep,
+    TrendingLimitDep,
 )
 from app.models import (
+    BulkAction,
+    BulkJob,
+    BulkJobOut,
+    ExportFormat,
     Paginated,
     ShortUrl,
     ShortUrlOut,
+    SortingParams,
+    SortOrder,
+    TrendingShortUrlOut,
     User,
     UserIn,
     UserOut,
     UserOutPrivate,
     UserUpdate,
 )
+from app.pagination import paginate
+from app.utils import normalize_email, normalize_username
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -27,7 +44,7 @@ router = APIRouter(prefix="/users", tags=["users"])
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=UserOut)
 async def create_user(*, user_in: UserIn) -> User:
     duplicate_username_user = await User.find(
-        {"username": {"$regex": f"^{re.escape(user_in.username)}$", "$options": "i"}}
+        User.username == normalize_username(user_in.username)
     ).first_or_none()
     if duplicate_username_user:
         raise HTTPException(
@@ -35,7 +52,7 @@ async def create_user(*, user_in: UserIn) -> User:
         )
 
     duplicate_email_user = await User.find(
-        {"email": {"$regex": f"^{re.escape(user_in.email)}$", "$options": "i"}}
+        User.email == normalize_email(user_in.email)
     ).first_or_none()
     if duplicate_email_user:
         raise HTTPException(
@@ -44,8 +61,8 @@ async def create_user(*, user_in: UserIn) -> User:
 
     user = User(
         **user_in.model_dump(exclude={"email", "password"}),
-        email=user_in.email.lower(),
-        password_hash=hash_password(user_in.password),
+        email=normalize_email(user_in.email),
+        password_hash=await hash_password(user_in.password),
     )
     await user.insert()
 
@@ -58,22 +75,9 @@ async def read_users(
     _superuser: CurrentActiveSuperUserDep,
     pagination_params: PaginationParamsDep,
     sort_params: SortParamsDep,
-) -> Paginated[User]:
-    users_query = User.find()
-
-    total_count = await users_query.count()
-    short_urls = (
-        await users_query.skip(pagination_params.skip)
-        .limit(pagination_params.limit)
-        .sort((sort_params.sort, sort_params.order.direction))
-        .to_list()
-    )
-
-    return Paginated(
-        page=pagination_params.page,
-        per_page=pagination_params.per_page,
-        total=total_count,
-        results=short_urls,
+) -> Response:
+    return await paginate(
+        User.find(), pagination_params, sort_params, model=UserOutPrivate
     )
 
 
@@ -85,47 +89,50 @@ async def read_current_user(*, user: CurrentActiveUserDep) -> User:
 @router.get("/me/urls", response_model=Paginated[ShortUrlOut])
 async def read_current_user_short_urls(
     *,
-    user: CurrentActiveUserDep,
+    user: CurrentActivePrincipalDep,
     pagination_params: PaginationParamsDep,
     sort_params: SortParamsDep,
-) -> Paginated:
-    short_urls_query = ShortUrl.find(ShortUrl.user_id == user.id)
-
-    total_count = await short_urls_query.count()
-    short_urls = (
-        await short_urls_query.skip(pagination_params.skip)
-        .limit(pagination_params.limit)
-        .sort((sort_params.sort, sort_params.order.direction))
-        .to_list()
+) -> Response:
+    return await paginate(
+        ShortUrl.find(ShortUrl.user_id == user.id),
+        pagination_params,
+        sort_params,
+        model=ShortUrlOut,
     )
 
-    return Paginated(
-        page=pagination_params.page,
-        per_page=pagination_params.per_page,
-        total=total_count,
-        results=short_urls,
+
+@router.get("/me/urls/export", response_class=StreamingResponse)
+async def export_current_user_short_urls(
+    *,
+    user: CurrentActivePrincipalDep,
+    export_format: ExportFormatDep = ExportFormat.NDJSON,
+) -> StreamingResponse:
+    return stream_short_urls(
+        {"user_id": user.id},
+        export_format=export_format,
+        fields=SHORT_URL_EXPORT_FIELDS,
+        filename=f"{user.username}-urls",
     )
 
 
 @router.get("/me/most-visited", response_model=Paginated[ShortUrlOut])
 async def read_current_user_most_visited_short_urls(
-    *, user: CurrentActiveUserDep, pagination_params: PaginationParamsDep
-) -> Paginated:
-    most_visited_short_urls_query = ShortUrl.find(ShortUrl.user_id == user.id)
-
-    total_count = await most_visited_short_urls_query.count()
-    most_visited_short_urls = (
-        await most_visited_short_urls_query.skip(pagination_params.skip)
-        .limit(pagination_params.limit)
-        .sort(("views", SortDirection.DESCENDING))
-        .to_list()
+    *, user: CurrentActivePrincipalDep, pagination_params: PaginationParamsDep
+) -> Response:
+    return await paginate(
+        ShortUrl.find(ShortUrl.user_id == user.id),
+        pagination_params,
+        SortingParams(sort="views", order=SortOrder.DESC),
+        model=ShortUrlOut,
     )
 
-    return Paginated(
-        page=pagination_params.page,
-        per_page=pagination_params.per_page,
-        total=total_count,
-        results=most_visited_short_urls,
+
+@router.get("/me/trending", response_model=list[TrendingShortUrlOut])
+async def read_current_user_trending_short_urls(
+    *, user: CurrentActivePrincipalDep, limit: TrendingLimitDep = 10
+) -> list[dict]:
+    return await find_trending_short_urls(
+        {"user_id": user.id}, limit=limit, model=TrendingShortUrlOut
     )
 
 
@@ -133,14 +140,11 @@ async def read_current_user_most_visited_short_urls(
 async def update_current_user(
     *, user: CurrentActiveUserDep, updates: UserUpdate
 ) -> User:
+    previous_username = user.username
+
     if updates.username is not None:
         duplicate_username_user = await User.find(
-            {
-                "username": {
-                    "$regex": f"^{re.escape(updates.username)}$",
-                    "$options": "i",
-                }
-            }
+            User.username == normalize_username(updates.username)
         ).first_or_none()
         if duplicate_username_user:
             raise HTTPException(
@@ -148,22 +152,57 @@ async def update_current_user(
                 detail="Username already exists",
             )
 
-        user.username = updates.username
+        user.username = normalize_username(updates.username)
 
     if updates.email is not None:
         duplicate_email_user = await User.find(
-            {"email": {"$regex": f"^{re.escape(updates.email)}$", "$options": "i"}}
+            User.email == normalize_email(updates.email)
         ).first_or_none()
         if duplicate_email_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Email already exists"
             )
 
-        user.email = updates.email.lower()
+        user.email = normalize_email(updates.email)
 
     if updates.password is not None:
-        user.password_hash = hash_password(updates.password)
+        user.password_hash = await hash_password(updates.password)
+        # Revoke every access token issued with the old password
+        user.token_version += 1
 
     await user.save_changes()
+    principal_cache.invalidate_where(
+        lambda key: key[0] in (str(user.id), previous_username)
+    )
+    token_version_cache.invalidate(str(user.id))
 
     return user
+
+
+@router.delete(
+    "/{user_id}",
+    tags=["admin"],
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=BulkJobOut,
+)
+async def delete_user(
+    *, superuser: CurrentActiveSuperUserDep, user_id: PydanticObjectId
+) -> BulkJob:
+    """Deletes the user and their links in the background, poll `/jobs/{job_id}`."""
+    if user_id == superuser.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Superusers can't delete themselves",
+        )
+
+    if not await User.get(user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id {str(user_id)!r} not found",
+        )
+
+    return await bulk_jobs.submit(
+        BulkAction.DELETE_USER,
+        {"user_id": str(user_id)},
+        partial(bulk_jobs.delete_user, user_id=user_id),
+    )
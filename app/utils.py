@@ -1,8 +1,96 @@
-import random
-from hashlib import md5
+import secrets
+import string
+from hashlib import blake2b
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
+BASE62_ALPHABET = string.digits + string.ascii_letters
 
-def generate_url_ident(url: str, length: int) -> str:
-    """Returns a unique identifier for the given URL with the given length."""
-    digest = md5(url.encode()).hexdigest()
-    return "".join(random.choices(digest, k=length))
+# Odd and not divisible by 31, so it's coprime with every power of 62 and
+# multiplying by it permutes the ident space
+SCRAMBLE_MULTIPLIER = 1_000_000_007
+
+
+def normalize_username(username: str) -> str:
+    """Returns the lookup key for a username, usernames are case-insensitive."""
+    return username.strip().lower()
+
+
+def normalize_email(email: str) -> str:
+    """Returns the lookup key for an email, emails are case-insensitive."""
+    return email.strip().lower()
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_origin(url: str) -> str:
+    """Returns the canonical form of a URL, used to recognize the same origin.
+
+    Lowercases the scheme and host, drops default ports and trailing slashes and
+    sorts query parameters. The origin itself is stored as given.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+
+    netloc = parts.hostname or ""
+    if ":" in netloc:
+        netloc = f"[{netloc}]"
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo = f"{userinfo}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+
+    return urlunsplit((scheme, netloc, path, query, parts.fragment))
+
+
+def hash_origin(url: str) -> int:
+    """Returns a signed 64-bit hash of the canonical URL, it fits a BSON long."""
+    digest = blake2b(canonicalize_origin(url).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, signed=True)
+
+
+def generate_url_ident(length: int) -> str:
+    """Returns a random base62 identifier with the given length."""
+    return "".join(secrets.choice(BASE62_ALPHABET) for _ in range(length))
+
+
+def encode_base62(number: int, length: int = 0) -> str:
+    """Encodes a non-negative integer as base62, left-padded to `length`."""
+    digits = []
+    while number:
+        number, remainder = divmod(number, 62)
+        digits.append(BASE62_ALPHABET[remainder])
+
+    return "".join(reversed(digits)).rjust(length, BASE62_ALPHABET[0])
+
+
+def reverse_base62_digits(number: int, length: int) -> int:
+    reversed_number = 0
+    for _ in range(length):
+        number, remainder = divmod(number, 62)
+        reversed_number = reversed_number * 62 + remainder
+
+    return reversed_number
+
+
+def scramble_id(number: int, length: int, rounds: int = 3) -> int:
+    """Bijectively maps `number` onto another integer in `[0, 62**length)`.
+
+    Sequential counters become non-sequential idents with the same length, numbers
+    outside of the space are returned as is.
+    """
+    space = 62**length
+    if number >= space:
+        return number
+
+    for _ in range(rounds):
+        number = (number * SCRAMBLE_MULTIPLIER + space // 3) % space
+        number = reverse_base62_digits(number, length)
+
+    return number
@@ -0,0 +1,72 @@
+from dataclasses import dataclass, field
+from urllib.parse import urlencode
+
+from starlette.types import ASGIApp, Message
+
+
+@dataclass(slots=True)
+class Response:
+    status: int
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+
+class ASGIClient:
+    """Minimal in-process HTTP client that calls an ASGI app directly.
+
+    Skips the network and the server so benchmarks measure the app itself.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        headers: dict[str, str] | None = None,
+        query: dict[str, str | int] | None = None,
+        body: bytes = b"",
+    ) -> Response:
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": urlencode(query or {}).encode(),
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in (headers or {}).items()
+            ],
+            "client": ("127.0.0.1", 12345),
+            "server": ("testserver", 80),
+        }
+        request_sent = False
+        response = Response(status=0)
+
+        async def receive() -> Message:
+            nonlocal request_sent
+            if request_sent:
+                return {"type": "http.disconnect"}
+
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response.status = message["status"]
+                response.headers = {
+                    name.decode(): value.decode()
+                    for name, value in message.get("headers", [])
+                }
+            elif message["type"] == "http.response.body":
+                response.body += message.get("body", b"")
+
+        await self.app(scope, receive, send)
+
+        return response
@@ -0,0 +1,240 @@
+"""Reproducible load test of the redirect, shorten, list and token workloads.
+
+Boots `app.main:app` in-process against `<MONGO_DB_NAME>-loadtest` on the
+configured MongoDB (e.g. a local `mongod`), seeds users and short URLs, and
+drives every workload at a fixed concurrency through an in-process ASGI client.
+Results are written as JSON and optionally compared against a stored baseline.
+
+Usage:
+    uv run python -m benchmarks.loadtest --output results.json
+    uv run python -m benchmarks.loadtest --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+from pathlib import Path
+
+from app.core.config import config
+from app.core.metrics import mongo_command_duration_seconds
+from app.core.security import password_hash
+from app.main import app, lifespan
+from app.models import ShortUrl, User
+from benchmarks.asgi import ASGIClient, Response
+from benchmarks.utils import percentile
+
+BENCH_PASSWORD = "benchmark-password"
+
+type Workload = Callable[[ASGIClient, int], Awaitable[Response]]
+
+
+async def seed(users: int, urls: int) -> None:
+    now = datetime.now(tz=UTC)
+    # Hash once, Argon2 would otherwise dominate seeding time
+    hashed_password = password_hash.hash(BENCH_PASSWORD)
+    await User.get_pymongo_collection().insert_many(
+        [
+            {
+                "username": f"user{i}",
+                "email": f"user{i}@example.com",
+                "password_hash": hashed_password,
+                "is_active": True,
+                "is_superuser": False,
+                "token_version": 0,
+                "created_at": now,
+            }
+            for i in range(users)
+        ]
+    )
+    owner = await User.find(User.username == "user0").first_or_none()
+    assert owner is not None
+
+    for offset in range(0, urls, 10_000):
+        await ShortUrl.get_pymongo_collection().insert_many(
+            [
+                {
+                    "ident": f"bench{i}",
+                    "origin": f"https://example.com/articles/{i}",
+                    "views": 0,
+                    "created_at": now,
+                    "slug": f"bench-{i}",
+                    "user_id": owner.id,
+                }
+                for i in range(offset, min(offset + 10_000, urls))
+            ]
+        )
+
+
+async def get_token(client: ASGIClient, username: str) -> str:
+    response = await client.request(
+        "POST",
+        "/token",
+        headers={"content-type": "application/x-www-form-urlencoded"},
+        body=f"username={username}&password={BENCH_PASSWORD}".encode(),
+    )
+    return json.loads(response.body)["access_token"]
+
+
+def make_workloads(users: int, urls: int, token: str) -> dict[str, Workload]:
+    auth = {"authorization": f"Bearer {token}"}
+
+    async def redirect(client: ASGIClient, _i: int) -> Response:
+        return await client.request("GET", f"/redirect/bench{random.randrange(urls)}")
+
+    async def shorten(client: ASGIClient, i: int) -> Response:
+        return await client.request(
+            "POST",
+            "/shorten",
+            headers={**auth, "content-type": "application/json"},
+            body=json.dumps(
+                {
+                    "url": f"https://example.com/new/{i}",
+                    "slug": f"new-{i}-{time.time_ns()}",
+                }
+            ).encode(),
+        )
+
+    async def list_urls(client: ASGIClient, _i: int) -> Response:
+        return await client.request(
+            "GET", "/users/me/urls", headers=auth, query={"per_page": 20}
+        )
+
+    async def login(client: ASGIClient, _i: int) -> Response:
+        username = f"user{random.randrange(users)}"
+        return await client.request(
+            "POST",
+            "/token",
+            headers={"content-type": "application/x-www-form-urlencoded"},
+            body=f"username={username}&password={BENCH_PASSWORD}".encode(),
+        )
+
+    return {
+        "redirect": redirect,
+        "shorten": shorten,
+        "list": list_urls,
+        "token": login,
+    }
+
+
+async def run_workload(
+    client: ASGIClient, workload: Workload, *, requests: int, concurrency: int
+) -> dict[str, float]:
+    samples: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            started_at = time.perf_counter()
+            response = await workload(client, i)
+            samples.append(time.perf_counter() - started_at)
+            if response.status >= 400:
+                errors += 1
+
+    db_ops_before = mongo_command_duration_seconds.count
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+    db_ops = mongo_command_duration_seconds.count - db_ops_before
+
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": len(samples) / elapsed,
+        "p50_ms": percentile(samples, 50) * 1e3,
+        "p95_ms": percentile(samples, 95) * 1e3,
+        "p99_ms": percentile(samples, 99) * 1e3,
+        "db_ops_per_request": db_ops / len(samples) if samples else 0.0,
+    }
+
+
+def compare(results: dict, baseline: dict) -> None:
+    print(
+        f"\n{'workload':<12}{'metric':<22}{'baseline':>12}{'current':>12}{'change':>10}"
+    )
+    for name, current in results["workloads"].items():
+        previous = baseline.get("workloads", {}).get(name)
+        if previous is None:
+            continue
+        for metric in ("throughput_rps", "p50_ms", "p99_ms", "db_ops_per_request"):
+            before, after = previous[metric], current[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            print(
+                f"{name:<12}{metric:<22}{before:>12.2f}{after:>12.2f}{change:>+9.1f}%"
+            )
+
+
+async def main(args: argparse.Namespace) -> dict:
+    config.mongo_db_name = f"{config.mongo_db_name}-loadtest"
+    config.metrics_enabled = True
+    # Every request comes from the same client
+    config.rate_limit_enabled = False
+
+    client = ASGIClient(app)
+    async with lifespan(app):
+        database = User.get_pymongo_collection().database
+        try:
+            await seed(args.users, args.urls)
+            token = await get_token(client, "user0")
+            workloads = make_workloads(args.users, args.urls, token)
+
+            results: dict[str, dict[str, float]] = {}
+            for name in args.workloads:
+                results[name] = await run_workload(
+                    client,
+                    workloads[name],
+                    requests=args.requests,
+                    concurrency=args.concurrency,
+                )
+                print(
+                    f"{name:<10} {results[name]['throughput_rps']:>9.0f} req/s  "
+                    f"p50 {results[name]['p50_ms']:.2f}ms  "
+                    f"p95 {results[name]['p95_ms']:.2f}ms  "
+                    f"p99 {results[name]['p99_ms']:.2f}ms  "
+                    f"db ops/req {results[name]['db_ops_per_request']:.2f}"
+                )
+        finally:
+            await database.client.drop_database(database.name)
+
+    return {
+        "created_at": datetime.now(tz=UTC).isoformat(),
+        "python": platform.python_version(),
+        "params": {
+            "users": args.users,
+            "urls": args.urls,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "workloads": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--urls", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--workloads",
+        nargs="+",
+        choices=["redirect", "shorten", "list", "token"],
+        default=["redirect", "shorten", "list", "token"],
+    )
+    parser.add_argument("--output", type=Path, default=Path("loadtest-results.json"))
+    parser.add_argument("--baseline", type=Path)
+    args = parser.parse_args()
+
+    random.seed(0)
+    results = asyncio.run(main(args))
+
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {args.output}")
+    if args.baseline:
+        compare(results, json.loads(args.baseline.read_text()))
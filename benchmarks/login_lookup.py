@@ -0,0 +1,75 @@
+"""Compares the anchored case-insensitive `$regex` user lookup against the
+normalized point lookup as the number of users grows.
+
+Usage: uv run python -m benchmarks.login_lookup [--users 1000 10000 100000]
+"""
+
+import argparse
+import asyncio
+import random
+import re
+from datetime import UTC, datetime
+
+from app.models import User
+from app.utils import normalize_username
+from benchmarks.utils import init_bench_db, print_table, summarize, time_each
+
+
+async def find_user_by_regex(username: str) -> User | None:
+    return await User.find(
+        {"username": {"$regex": f"^{re.escape(username)}$", "$options": "i"}}
+    ).first_or_none()
+
+
+async def find_user_by_key(username: str) -> User | None:
+    return await User.find(
+        User.username == normalize_username(username)
+    ).first_or_none()
+
+
+async def main(user_counts: list[int], lookups: int) -> None:
+    client, database = await init_bench_db()
+    try:
+        seeded = 0
+        for user_count in sorted(user_counts):
+            await User.get_pymongo_collection().insert_many(
+                [
+                    {
+                        "username": f"user{i}",
+                        "email": f"user{i}@example.com",
+                        "password_hash": "",
+                        "is_active": True,
+                        "is_superuser": False,
+                        "created_at": datetime.now(tz=UTC),
+                    }
+                    for i in range(seeded, user_count)
+                ]
+            )
+            seeded = user_count
+
+            usernames = [f"User{random.randrange(user_count)}" for _ in range(lookups)]
+            print(f"\n{user_count} users")
+            print_table(
+                {
+                    "$regex ^...$ /i": summarize(
+                        await time_each(find_user_by_regex, usernames)
+                    ),
+                    "normalized key": summarize(
+                        await time_each(find_user_by_key, usernames)
+                    ),
+                }
+            )
+    finally:
+        await client.drop_database(database.name)
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--users", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.users, args.lookups))
@@ -0,0 +1,107 @@
+"""Reports storage and index sizes of `urls` with and without origin reuse.
+
+Seeds the same shorten requests twice: once creating a link per request (as
+without `reuse=true`), once reusing each user's existing link for the same
+canonical origin. Origins are long, popular URLs submitted with varying case,
+ports and query parameter order.
+
+Usage:
+    uv run python -m benchmarks.origin_storage [--users N] [--requests N] [--origins N]
+"""
+
+import argparse
+import asyncio
+import random
+
+from beanie import PydanticObjectId
+
+from app.models import ShortUrl, ShortUrlIn
+from app.routers.urls import build_short_url
+from app.utils import hash_origin
+from benchmarks.utils import init_bench_db
+
+
+def make_requests(users: int, requests: int, origins: int) -> list[tuple[int, str]]:
+    tracking = "&".join(f"utm_param_{i}=campaign-value-{i:04d}" for i in range(40))
+    popular = [
+        f"https://example.com/articles/{i}/a-fairly-long-article-slug?id={i}&{tracking}"
+        for i in range(origins)
+    ]
+
+    submitted = []
+    for _ in range(requests):
+        origin = random.choice(popular)
+        if random.random() < 0.5:
+            origin = origin.replace("https://example.com", "HTTPS://Example.com:443")
+        submitted.append((random.randrange(users), origin))
+
+    return submitted
+
+
+async def seed(
+    submitted: list[tuple[int, str]], user_ids: list[PydanticObjectId], *, reuse: bool
+) -> None:
+    seen: set[tuple[int, int]] = set()
+    batch: list[ShortUrl] = []
+    for i, (user, origin) in enumerate(submitted):
+        if reuse:
+            key = (user, hash_origin(origin))
+            if key in seen:
+                continue
+            seen.add(key)
+
+        batch.append(
+            build_short_url(
+                ShortUrlIn.model_validate({"url": origin, "slug": f"bench-{i}"}),
+                ident=f"b{i:07d}",
+                user_id=user_ids[user],
+            )
+        )
+        if len(batch) == 5_000:
+            await ShortUrl.insert_many(batch)
+            batch = []
+
+    if batch:
+        await ShortUrl.insert_many(batch)
+
+
+async def main(users: int, requests: int, origins: int) -> None:
+    submitted = make_requests(users, requests, origins)
+    user_ids = [PydanticObjectId() for _ in range(users)]
+
+    stats = {}
+    for name, reuse in {"link per request": False, "reuse=true": True}.items():
+        client, database = await init_bench_db(f"origins-{int(reuse)}")
+        try:
+            await seed(submitted, user_ids, reuse=reuse)
+            stats[name] = await database.command("collStats", "urls", scale=1024)
+        finally:
+            await client.drop_database(database.name)
+            await client.close()
+
+    print(f"{'':<28}" + "".join(f"{name:>20}" for name in stats))
+    for key in ("count", "size", "storageSize", "totalIndexSize"):
+        unit = "" if key == "count" else " KiB"
+        print(
+            f"{key + unit:<28}"
+            + "".join(f"{collection[key]:>20,.0f}" for collection in stats.values())
+        )
+    for index in next(iter(stats.values()))["indexSizes"]:
+        print(
+            f"{index + ' KiB':<28}"
+            + "".join(
+                f"{collection['indexSizes'][index]:>20,.0f}"
+                for collection in stats.values()
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--origins", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(0)
+    asyncio.run(main(args.users, args.requests, args.origins))
@@ -0,0 +1,75 @@
+"""Compares redirects served by `RedirectMiddleware` against the FastAPI route.
+
+Links are served from the in-memory redirect cache, so no database is needed and
+the difference is the framework overhead per request. Runs on a single core.
+
+Usage: uv run python -m benchmarks.redirect_asgi [--urls N] [--requests N]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from fastapi import FastAPI
+
+from app.core.cache import CachedShortUrl, redirect_cache
+from app.core.config import config
+from app.routers import redirect
+from benchmarks.asgi import ASGIClient
+from benchmarks.utils import print_table, summarize, time_each
+
+
+def make_app(*, fast_redirects: bool) -> FastAPI:
+    app = FastAPI()
+    if fast_redirects:
+        app.add_middleware(redirect.RedirectMiddleware)  # ty:ignore[invalid-argument-type]
+    app.include_router(redirect.router)
+    return app
+
+
+async def main(urls: int, requests: int) -> None:
+    config.rate_limit_enabled = False
+    for i in range(urls):
+        redirect_cache.set(
+            f"b{i:06d}",
+            CachedShortUrl(origin=f"https://example.com/articles/{i}?utm_source=bench"),
+        )
+    paths = [f"/redirect/b{random.randrange(urls):06d}" for _ in range(requests)]
+
+    results = {}
+    throughput = {}
+    for name, app in {
+        "fastapi route": make_app(fast_redirects=False),
+        "RedirectMiddleware": make_app(fast_redirects=True),
+    }.items():
+        client = ASGIClient(app)
+
+        async def get(path: str, client: ASGIClient = client) -> None:
+            await client.request("GET", path)
+
+        # Warm up, e.g. builds the middleware stack
+        await time_each(get, paths[:100])
+
+        started_at = time.perf_counter()
+        results[name] = summarize(await time_each(get, paths))
+        throughput[name] = requests / (time.perf_counter() - started_at)
+
+    print_table(results)
+    print()
+    for name, rps in throughput.items():
+        print(f"{name:<32}{rps:>12.0f} req/s")
+    print(
+        f"{'gain':<32}"
+        f"{throughput['RedirectMiddleware'] / throughput['fastapi route']:>12.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--urls", type=int, default=5_000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    asyncio.run(main(args.urls, args.requests))
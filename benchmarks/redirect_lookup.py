@@ -0,0 +1,63 @@
+"""Compares the lean redirect lookup against a hydrated Beanie document lookup.
+
+Usage: uv run python -m benchmarks.redirect_lookup [--urls N] [--lookups N]
+"""
+
+import argparse
+import asyncio
+import random
+
+from beanie import PydanticObjectId
+
+from app.models import ShortUrl
+from app.routers.redirect import find_short_url_target
+from benchmarks.utils import init_bench_db, print_table, summarize, time_each
+
+
+async def find_short_url_document(ident: str) -> ShortUrl | None:
+    return await ShortUrl.find(ShortUrl.ident == ident).first_or_none()
+
+
+async def main(urls: int, lookups: int) -> None:
+    client, database = await init_bench_db()
+    try:
+        user_id = PydanticObjectId()
+        await ShortUrl.insert_many(
+            [
+                ShortUrl(
+                    ident=f"b{i:06d}",
+                    origin=f"https://example.com/articles/{i}?utm_source=bench",
+                    slug=f"bench-{i}",
+                    user_id=user_id,
+                )
+                for i in range(urls)
+            ]
+        )
+        idents = [f"b{random.randrange(urls):06d}" for _ in range(lookups)]
+
+        # Warm up the connection pool and the server's cache
+        await time_each(find_short_url_target, idents[:100])
+        await time_each(find_short_url_document, idents[:100])
+
+        print_table(
+            {
+                "beanie find().first_or_none()": summarize(
+                    await time_each(find_short_url_document, idents)
+                ),
+                "raw find_one() with projection": summarize(
+                    await time_each(find_short_url_target, idents)
+                ),
+            }
+        )
+    finally:
+        await client.drop_database(database.name)
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--urls", type=int, default=10_000)
+    parser.add_argument("--lookups", type=int, default=5_000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.urls, args.lookups))
@@ -0,0 +1,106 @@
+"""Compares the CPU time spent serializing a page of short URLs.
+
+The response model path validates the raw documents into the
+`Paginated[ShortUrlOut]` response model before dumping it, as FastAPI does, the
+fast path (`app.pagination.render_page`) dumps the raw documents directly. The
+documents are built in memory the way pymongo returns them, so no database is
+needed, and Beanie hydration (which the response model path used to pay for on
+top) isn't included.
+
+Usage: uv run python -m benchmarks.serialization [--per-page N] [--pages N]
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+
+from bson import ObjectId
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models import Paginated, PaginationParams, ShortUrlOut
+from app.pagination import render_page
+from app.utils import hash_origin
+from benchmarks.utils import print_table, summarize
+
+
+def make_document(i: int, user_id: ObjectId) -> dict:
+    """Returns a `urls` document as read by pymongo."""
+    origin = f"https://example.com/articles/{i}?utm_source=bench"
+    return {
+        "_id": ObjectId(),
+        "ident": f"b{i:06d}",
+        "origin": origin,
+        "origin_hash": hash_origin(origin),
+        "views": i,
+        "trend_score": None,
+        "created_at": datetime.now(tz=UTC),
+        "expires_at": None,
+        "last_visit_at": None,
+        "slug": f"bench-{i}",
+        "user_id": user_id,
+        "redirect_status": 307,
+        "cache_max_age": None,
+        "analytics": True,
+    }
+
+
+async def time_cpu(func: Callable[[], Awaitable[bytes]], pages: int) -> list[float]:
+    samples = []
+    for _ in range(pages):
+        started_at = time.process_time()
+        await func()
+        samples.append(time.process_time() - started_at)
+
+    return samples
+
+
+async def main(per_page: int, pages: int) -> None:
+    user_id = ObjectId()
+    documents = [make_document(i, user_id) for i in range(per_page)]
+    pagination_params = PaginationParams(per_page=per_page)
+    response_field = create_model_field(
+        "Response_bench", Paginated[ShortUrlOut], mode="serialization"
+    )
+
+    async def serialize_with_response_model() -> bytes:
+        page = {
+            "page": pagination_params.page,
+            "per_page": pagination_params.per_page,
+            "results": documents,
+        }
+        # Runs FastAPI's own response validation and `dump_json`
+        return await serialize_response(
+            field=response_field, response_content=page, dump_json=True
+        )
+
+    async def serialize_with_render_page() -> bytes:
+        return render_page(
+            documents,
+            model=ShortUrlOut,
+            pagination_params=pagination_params,
+            total=None,
+            next_cursor=None,
+        )
+
+    print_table(
+        {
+            "response_model": summarize(
+                await time_cpu(serialize_with_response_model, pages)
+            ),
+            "render_page (raw documents)": summarize(
+                await time_cpu(serialize_with_render_page, pages)
+            ),
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=1_000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.per_page, args.pages))
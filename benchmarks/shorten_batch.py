@@ -0,0 +1,66 @@
+"""Compares shortening throughput of the single-item and the batch endpoint.
+
+Usage: uv run python -m benchmarks.shorten_batch [--links N] [--batch-size N]
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import Request, Response
+
+from app.core.config import config
+from app.models import ShortUrlIn, User
+from app.routers.urls import create_short_url, create_short_urls
+from benchmarks.utils import init_bench_db
+
+
+def make_short_urls_in(prefix: str, count: int) -> list[ShortUrlIn]:
+    return [
+        ShortUrlIn.model_validate(
+            {"url": f"https://example.com/{prefix}/{i}", "slug": f"{prefix}-{i}"}
+        )
+        for i in range(count)
+    ]
+
+
+async def main(links: int, batch_size: int) -> None:
+    # Measures the endpoints, not the limiter
+    config.rate_limit_enabled = False
+    client, database = await init_bench_db()
+    try:
+        user = User(username="bench", email="bench@example.com", password_hash="")
+        await user.insert()
+
+        single = make_short_urls_in("single", links)
+        started_at = time.perf_counter()
+        for short_url_in in single:
+            await create_short_url(
+                user=user, short_url_in=short_url_in, response=Response()
+            )
+        single_elapsed = time.perf_counter() - started_at
+
+        batch = make_short_urls_in("batch", links)
+        started_at = time.perf_counter()
+        for offset in range(0, links, batch_size):
+            await create_short_urls(
+                request=Request({"type": "http", "headers": []}),
+                user=user,
+                short_urls_in=batch[offset : offset + batch_size],
+            )
+        batch_elapsed = time.perf_counter() - started_at
+
+        print(f"POST /shorten        {links / single_elapsed:>10.0f} links/s")
+        print(f"POST /shorten/batch  {links / batch_elapsed:>10.0f} links/s")
+    finally:
+        await client.drop_database(database.name)
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--links", type=int, default=5_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.links, args.batch_size))
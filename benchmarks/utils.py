@@ -0,0 +1,63 @@
+import statistics
+import time
+from collections.abc import Awaitable, Callable, Iterable
+
+from beanie import init_beanie
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.core.config import config
+from app.models import __beanie_models__
+
+
+async def init_bench_db(
+    suffix: str = "bench",
+) -> tuple[AsyncMongoClient, AsyncDatabase]:
+    """Initializes Beanie against a throwaway database next to the configured one."""
+    client = AsyncMongoClient(str(config.mongo_uri), tz_aware=True)
+    await client.drop_database(f"{config.mongo_db_name}-{suffix}")
+    database = client[f"{config.mongo_db_name}-{suffix}"]
+    await init_beanie(database=database, document_models=__beanie_models__)
+
+    return client, database
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(q / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Summarizes latency samples given in seconds as microseconds."""
+    return {
+        "count": len(samples),
+        "mean_us": statistics.fmean(samples) * 1e6 if samples else 0.0,
+        "p50_us": percentile(samples, 50) * 1e6,
+        "p95_us": percentile(samples, 95) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+    }
+
+
+async def time_each[T](
+    func: Callable[[T], Awaitable[object]], args: Iterable[T]
+) -> list[float]:
+    samples = []
+    for arg in args:
+        started_at = time.perf_counter()
+        await func(arg)
+        samples.append(time.perf_counter() - started_at)
+
+    return samples
+
+
+def print_table(results: dict[str, dict[str, float]]) -> None:
+    print(f"{'name':<32}{'count':>8}{'mean_us':>12}{'p50_us':>12}{'p99_us':>12}")
+    for name, result in results.items():
+        print(
+            f"{name:<32}{result['count']:>8.0f}{result['mean_us']:>12.1f}"
+            f"{result['p50_us']:>12.1f}{result['p99_us']:>12.1f}"
+        )
@@ -0,0 +1,30 @@
+from beanie import free_fall_migration
+from pymongo.asynchronous.client_session import AsyncClientSession
+
+from app.models import User
+
+
+class Forward:
+    @free_fall_migration(document_models=[User])
+    async def normalize_user_lookup_keys(self, session: AsyncClientSession) -> None:
+        """Lowercases usernames and emails so lookups can match them exactly.
+
+        Fails on the unique indexes if two users only differ by case, those have
+        to be resolved by hand before running this migration.
+        """
+        await User.get_pymongo_collection().update_many(
+            {},
+            [
+                {
+                    "$set": {
+                        "username": {"$trim": {"input": {"$toLower": "$username"}}},
+                        "email": {"$trim": {"input": {"$toLower": "$email"}}},
+                    }
+                }
+            ],
+            session=session,
+        )
+
+
+class Backward:
+    pass
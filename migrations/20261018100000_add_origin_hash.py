@@ -0,0 +1,35 @@
+from beanie import free_fall_migration
+from pymongo import UpdateOne
+from pymongo.asynchronous.client_session import AsyncClientSession
+
+from app.models import ShortUrl
+from app.utils import hash_origin
+
+BATCH_SIZE = 1_000
+
+
+class Forward:
+    @free_fall_migration(document_models=[ShortUrl])
+    async def add_origin_hash(self, session: AsyncClientSession) -> None:
+        """Backfills `origin_hash` so existing links can be reused by origin."""
+        collection = ShortUrl.get_pymongo_collection()
+        operations: list[UpdateOne] = []
+        async for document in collection.find(
+            {"origin_hash": None}, {"origin": True}, session=session
+        ):
+            operations.append(
+                UpdateOne(
+                    {"_id": document["_id"]},
+                    {"$set": {"origin_hash": hash_origin(document["origin"])}},
+                )
+            )
+            if len(operations) >= BATCH_SIZE:
+                await collection.bulk_write(operations, ordered=False, session=session)
+                operations = []
+
+        if operations:
+            await collection.bulk_write(operations, ordered=False, session=session)
+
+
+class Backward:
+    pass
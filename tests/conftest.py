@@ -0,0 +1,9 @@
+import os
+
+# Settings are read on import, the tests don't talk to the database
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB_NAME", "url-shortener-api-test")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("FIRST_SUPERUSER", "admin")
+os.environ.setdefault("FIRST_SUPERUSER_EMAIL", "admin@example.com")
+os.environ.setdefault("FIRST_SUPERUSER_PASSWORD", "password")
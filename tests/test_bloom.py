@@ -0,0 +1,35 @@
+import pytest
+
+from app.core.bloom import BloomFilter
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    bloom_filter = BloomFilter(1_000, 0.01)
+    items = [f"item-{i}" for i in range(1_000)]
+    for item in items:
+        bloom_filter.add(item)
+
+    assert all(item in bloom_filter for item in items)
+    assert bloom_filter.count == len(items)
+
+
+@pytest.mark.parametrize("false_positive_rate", [0.1, 0.01, 0.001])
+def test_bloom_filter_false_positive_rate(false_positive_rate: float) -> None:
+    capacity = 20_000
+    bloom_filter = BloomFilter(capacity, false_positive_rate)
+    for i in range(capacity):
+        bloom_filter.add(f"present-{i}")
+
+    trials = 200_000
+    false_positives = sum(f"absent-{i}" in bloom_filter for i in range(trials))
+
+    # Well within the noise of a filter sized for the target rate
+    assert false_positives / trials < false_positive_rate * 1.5
+
+
+def test_bloom_filter_is_sized_for_its_capacity() -> None:
+    bloom_filter = BloomFilter(1_000_000, 0.01)
+
+    # ~9.6 bits and 7 hashes per item at 1%
+    assert bloom_filter.memory_bytes == pytest.approx(1_198_132, rel=0.01)
+    assert bloom_filter.hash_count == 7
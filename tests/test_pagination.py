@@ -0,0 +1,124 @@
+from datetime import UTC, datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.models import SortingParams, SortOrder
+from app.pagination import decode_cursor, encode_cursor, seek_filter
+
+
+def matches(document: dict, query: dict) -> bool:
+    """Evaluates the subset of MongoDB queries `seek_filter` builds.
+
+    Like MongoDB, `$gt` and `$lt` never match nulls or missing fields, and
+    equality with `None` matches both.
+    """
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+            continue
+
+        value = document.get(key)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+
+        for operator, operand in condition.items():
+            if operator == "$ne":
+                matched = value != operand
+            elif operator == "$gt":
+                matched = value is not None and value > operand
+            else:
+                matched = value is not None and value < operand
+            if not matched:
+                return False
+
+    return True
+
+
+def sort_documents(documents: list[dict], sort_params: SortingParams) -> list[dict]:
+    # Nulls and missing fields sort first in ascending order
+    return sorted(
+        documents,
+        key=lambda document: (
+            document.get(sort_params.sort) is not None,
+            document.get(sort_params.sort) or 0,
+            document["_id"],
+        ),
+        reverse=sort_params.order is SortOrder.DESC,
+    )
+
+
+def paginate(
+    documents: list[dict], sort_params: SortingParams, per_page: int
+) -> list[dict]:
+    """Reads every page, each one seeking past the previous page's cursor."""
+    results: list[dict] = []
+    cursor = None
+    while True:
+        candidates = documents
+        if cursor is not None:
+            value, last_id = decode_cursor(cursor, sort_params)
+            query = seek_filter(sort_params, value, last_id)
+            candidates = [
+                document for document in documents if matches(document, query)
+            ]
+
+        page = sort_documents(candidates, sort_params)[:per_page]
+        if not page:
+            return results
+        results += page
+        cursor = encode_cursor(sort_params, page[-1])
+
+
+DOCUMENTS = [
+    {"_id": ObjectId(), "views": views, "last_visit_at": last_visit_at}
+    for views, last_visit_at in [
+        (3, datetime(2026, 1, 2, tzinfo=UTC)),
+        (0, None),
+        (3, datetime(2026, 1, 1, tzinfo=UTC)),
+        (7, datetime(2026, 1, 2, tzinfo=UTC)),
+        (0, None),
+        (1, datetime(2026, 1, 3, tzinfo=UTC)),
+    ]
+] + [{"_id": ObjectId(), "views": 3}]
+
+
+@pytest.mark.parametrize("sort", ["views", "last_visit_at", "_id"])
+@pytest.mark.parametrize("order", [SortOrder.ASC, SortOrder.DESC])
+@pytest.mark.parametrize("per_page", [1, 2, 3])
+def test_cursor_pages_match_a_single_sort(
+    sort: str, order: SortOrder, per_page: int
+) -> None:
+    sort_params = SortingParams(sort=sort, order=order)
+
+    assert paginate(DOCUMENTS, sort_params, per_page) == sort_documents(
+        DOCUMENTS, sort_params
+    )
+
+
+def test_cursor_round_trips_its_position() -> None:
+    sort_params = SortingParams(sort="last_visit_at", order=SortOrder.DESC)
+    document = DOCUMENTS[0]
+
+    assert decode_cursor(encode_cursor(sort_params, document), sort_params) == (
+        document["last_visit_at"],
+        document["_id"],
+    )
+
+
+def test_cursor_is_rejected_for_another_sort() -> None:
+    cursor = encode_cursor(SortingParams(sort="views"), DOCUMENTS[0])
+
+    with pytest.raises(HTTPException):
+        decode_cursor(cursor, SortingParams(sort="created_at"))
+    with pytest.raises(HTTPException):
+        decode_cursor(cursor, SortingParams(sort="views", order=SortOrder.DESC))
+
+
+def test_malformed_cursor_is_rejected() -> None:
+    with pytest.raises(HTTPException):
+        decode_cursor("not a cursor", SortingParams())
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import ratelimit
+from app.core.config import config
+from app.core.ratelimit import MemoryRateLimitBackend, RateLimiter
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    return clock
+
+
+def hit(backend: MemoryRateLimitBackend, *, cost: int = 1) -> float:
+    return asyncio.run(backend.hit("key", burst=3, rate=0.5, cost=cost))
+
+
+def test_bucket_allows_a_burst_then_refills(clock: Clock) -> None:
+    backend = MemoryRateLimitBackend()
+
+    assert [hit(backend) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert hit(backend) == pytest.approx(2.0)
+
+    clock.now += 1.0
+    assert hit(backend) == pytest.approx(1.0)
+    clock.now += 1.0
+    assert hit(backend) == 0.0
+    assert hit(backend) == pytest.approx(2.0)
+
+
+def test_bucket_refills_up_to_its_burst(clock: Clock) -> None:
+    backend = MemoryRateLimitBackend()
+    hit(backend)
+
+    clock.now += 3_600.0
+    assert [hit(backend) for _ in range(4)][-1] == pytest.approx(2.0)
+
+
+def test_costly_hit_drains_a_full_bucket_into_debt(clock: Clock) -> None:
+    backend = MemoryRateLimitBackend()
+
+    assert hit(backend, cost=2) == 0.0
+    # Only one token left
+    assert hit(backend, cost=2) == pytest.approx(2.0)
+
+    clock.now += 4.0
+    assert hit(backend, cost=10) == 0.0
+    # 7 tokens in debt, a single token takes 16 seconds
+    assert hit(backend) == pytest.approx(16.0)
+    clock.now += 16.0
+    assert hit(backend) == 0.0
+
+
+def test_refilled_buckets_are_swept(clock: Clock) -> None:
+    backend = MemoryRateLimitBackend(shards=2, sweep_interval=2.0)
+    hit(backend)
+    assert len(backend) == 1
+
+    # Refilled after 2 seconds, both shards are swept within 2 more
+    clock.now += 2.0
+    asyncio.run(backend.hit("other", burst=3, rate=0.5))
+    clock.now += 1.0
+    asyncio.run(backend.hit("other", burst=3, rate=0.5))
+    assert len(backend) == 1
+
+
+@pytest.mark.usefixtures("clock")
+def test_limiter_rejects_with_retry_after(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "rate_limit_enabled", True)
+    limiter = RateLimiter("test", burst=3, rate=0.5, backend=MemoryRateLimitBackend())
+
+    asyncio.run(limiter.check("ip:1", cost=3))
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(limiter.check("ip:1"))
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers == {"Retry-After": "2"}
+    # Other keys have their own buckets
+    asyncio.run(limiter.check("ip:2"))
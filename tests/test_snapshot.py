@@ -0,0 +1,74 @@
+from datetime import UTC, datetime
+from pathlib import Path
+
+from app.core.cache import CachedShortUrl
+from app.core.snapshot import HEADER, HotLinkSnapshot, encode_snapshot, write_snapshot
+
+
+def load_snapshot(path: Path, entries: dict[str, CachedShortUrl]) -> HotLinkSnapshot:
+    write_snapshot(path, entries)
+    snapshot = HotLinkSnapshot(path)
+    assert snapshot.reload()
+    return snapshot
+
+
+def test_snapshot_lookup_returns_every_entry(tmp_path: Path) -> None:
+    entries = {
+        f"ident{i}": CachedShortUrl(origin=f"https://example.com/{i}")
+        for i in range(1_000)
+    }
+    entries["custom"] = CachedShortUrl(
+        origin="https://example.com/ünïcode?q=1#top",
+        expires_at=datetime(2026, 6, 1, 12, 30, 15, 250_000, tzinfo=UTC),
+        status_code=301,
+        max_age=0,
+        analytics=False,
+    )
+
+    snapshot = load_snapshot(tmp_path / "hot-links.bin", entries)
+
+    assert len(snapshot) == len(entries)
+    for ident, entry in entries.items():
+        assert snapshot.lookup(ident) == entry
+
+
+def test_snapshot_lookup_misses_unknown_idents(tmp_path: Path) -> None:
+    snapshot = load_snapshot(
+        tmp_path / "hot-links.bin",
+        {"abc": CachedShortUrl(origin="https://example.com")},
+    )
+
+    assert snapshot.lookup("abd") is None
+    assert snapshot.lookup("") is None
+
+
+def test_empty_snapshot(tmp_path: Path) -> None:
+    snapshot = load_snapshot(tmp_path / "hot-links.bin", {})
+
+    assert len(snapshot) == 0
+    assert snapshot.lookup("abc") is None
+
+
+def test_snapshot_table_is_at_most_half_full() -> None:
+    entries = {
+        f"ident{i}": CachedShortUrl(origin="https://example.com") for i in range(5)
+    }
+
+    _, _, slot_count, entry_count = HEADER.unpack_from(encode_snapshot(entries))
+
+    assert entry_count == 5
+    assert slot_count == 16
+
+
+def test_snapshot_reload_ignores_invalid_and_unchanged_files(tmp_path: Path) -> None:
+    path = tmp_path / "hot-links.bin"
+    snapshot = HotLinkSnapshot(path)
+    assert not snapshot.reload()
+
+    path.write_bytes(b"not a snapshot" * 4)
+    assert not snapshot.reload()
+    assert snapshot.lookup("abc") is None
+
+    write_snapshot(path, {"abc": CachedShortUrl(origin="https://example.com")})
+    assert snapshot.reload()
+    assert not snapshot.reload()
@@ -0,0 +1,60 @@
+import pytest
+
+from app.utils import canonicalize_origin, hash_origin, scramble_id
+
+
+@pytest.mark.parametrize("length", [1, 2, 3])
+def test_scramble_id_is_a_permutation(length: int) -> None:
+    space = 62**length
+    scrambled = {scramble_id(number, length) for number in range(space)}
+
+    assert scrambled == set(range(space))
+
+
+def test_scramble_id_hides_the_sequence() -> None:
+    scrambled = [scramble_id(number, 6) for number in range(100)]
+
+    assert scrambled != sorted(scrambled)
+    assert all(0 <= number < 62**6 for number in scrambled)
+
+
+def test_scramble_id_keeps_numbers_outside_the_space() -> None:
+    assert scramble_id(62**4, 4) == 62**4
+
+
+@pytest.mark.parametrize(
+    ("url", "canonical"),
+    [
+        ("HTTPS://Example.COM:443/a/?b=2&a=1", "https://example.com/a?a=1&b=2"),
+        ("http://example.com:80", "http://example.com/"),
+        ("http://example.com:8080/x/", "http://example.com:8080/x"),
+        ("https://user:pw@Example.com/", "https://user:pw@example.com/"),
+        ("http://[::1]:8000/p", "http://[::1]:8000/p"),
+        ("https://example.com/p?b=1&a=#top", "https://example.com/p?a=&b=1#top"),
+    ],
+)
+def test_canonicalize_origin(url: str, canonical: str) -> None:
+    assert canonicalize_origin(url) == canonical
+    assert canonicalize_origin(canonical) == canonical
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://example.com/Path",
+        "https://example.com/path?a=1",
+        "https://example.com/path#fragment",
+        "http://example.com/path",
+        "https://other.example.com/path",
+    ],
+)
+def test_canonicalize_origin_keeps_meaningful_differences(url: str) -> None:
+    assert canonicalize_origin(url) != canonicalize_origin("https://example.com/path")
+    assert hash_origin(url) != hash_origin("https://example.com/path")
+
+
+def test_hash_origin_fits_a_signed_64_bit_integer() -> None:
+    origin_hash = hash_origin("HTTPS://Example.com/a/")
+
+    assert origin_hash == hash_origin("https://example.com/a")
+    assert -(2**63) <= origin_hash < 2**63